@@ -1,8 +1,14 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+import base64
+import json
 import os
-from datetime import datetime
-from database import db, DatabaseManager
+from database import db
+from backups import BackupJobs, BackupStore, parse_retention_policy
+from coalescer import ToggleCoalescer
+from events import progress_events
+from rate_limiter import create_rate_limiter
+from topic_archive import start_compaction_schedule
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -10,29 +16,124 @@ CORS(app)  # Enable CORS for all routes
 # Base URL for all API routes
 BASE_URL = ""  # and not '/tracker' .. hence traefik stip this part away
 
-# Rate limiting storage
-request_counts = {}
+# Rate limiting: 60 requests per minute per user by default. RATE_LIMITS
+# adds per-endpoint and per-principal limits, e.g.
+# "update_topics=30/60,@teacher_dashboard=300/60", and RATE_LIMIT_DB shares
+# the counters between worker processes (see rate_limiter.py)
+rate_limiter = create_rate_limiter(limit=60, window=60)
+
+# Topic updates of the same student and syllabus arriving within
+# TOGGLE_COALESCE_MS of each other are written together, keeping the last
+# state of each topic (see coalescer.py); 0 writes every request on its own.
+# Updates that match the stored state (clients replaying after a reconnect)
+# are answered from a read without any write
+toggle_coalescer = ToggleCoalescer(
+    lambda email, syllabus_id, updates, name: db.submit_write(
+        db.update_topics_progress, email, syllabus_id, updates, name
+    ),
+    window=float(os.environ.get("TOGGLE_COALESCE_MS", 100)) / 1000,
+    read_unchanged=db.get_unchanged_progress,
+)
+
+# Backup store and the background jobs that fill and restore from it
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "/home/zakir/igcse-tracker-backups")
+backup_store = BackupStore(BACKUP_DIR)
+# BACKUP_INTERVAL_MINUTES enables scheduled backups, pruned by BACKUP_RETENTION
+backup_jobs = BackupJobs(
+    backup_store,
+    db.db_path,
+    parse_retention_policy(os.environ.get("BACKUP_RETENTION", "hourly=24,daily=30"))
+)
+
+# topic_updates rows older than TOPIC_UPDATES_RETENTION_DAYS are rolled up
+# into daily_topic_activity and moved to gzip files in TOPIC_ARCHIVE_DIR
+TOPIC_ARCHIVE_DIR = os.environ.get(
+    "TOPIC_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(db.db_path)), "topic_update_archive")
+)
+
+# Seconds between keepalive comments on an idle /events stream
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# Page size for paginated teacher listings (?limit= overrides, up to the max)
+DEFAULT_PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 200))
+MAX_PAGE_SIZE = 1000
+
+
+def start_background_jobs():
+    """Start the scheduled backups and the topic update compaction.
+
+    Never called on import: every WSGI worker and the dev server's reloader
+    parent import this module, and each would run its own copy. The dev
+    server's serving process calls it (see __main__); next to a WSGI
+    server, run "python app.py jobs" once instead.
+    """
+    backup_jobs.start_schedule(int(os.environ.get("BACKUP_INTERVAL_MINUTES", 0)) * 60)
+    start_compaction_schedule(
+        db,
+        TOPIC_ARCHIVE_DIR,
+        int(os.environ.get("TOPIC_UPDATES_RETENTION_DAYS", 90)),
+        int(os.environ.get("TOPIC_COMPACTION_INTERVAL_MINUTES", 60)) * 60
+    )
 
 
 def rate_limit_check(identifier):
-    """Simple rate limiting: 60 requests per minute per user"""
-    current_time = datetime.now().timestamp()
-    minute_window = int(current_time // 60)
+    """Count a request from identifier against the current endpoint's limit"""
+    return rate_limiter.check(identifier, scope=request.endpoint)
+
+
+def encode_page_cursor(key):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_page_cursor(cursor, key_length):
+    """Decode a cursor from encode_page_cursor(); raises ValueError if invalid"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if (
+        not isinstance(key, list)
+        or len(key) != key_length
+        or not all(isinstance(part, str) for part in key)
+    ):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def get_page_request(key_length):
+    """Read (limit, after_key) from ?limit=&cursor=; (None, None) means no paging"""
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limit is None and cursor is None:
+        return None, None
 
-    key = f"{identifier}_{minute_window}"
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    after = decode_page_cursor(cursor, key_length) if cursor else None
+    return limit, after
 
-    if key not in request_counts:
-        request_counts[key] = 0
 
-    request_counts[key] += 1
+def not_modified_response(etag):
+    """Return a 304 response if If-None-Match matches etag, else None"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
 
-    # Clean up old entries (keep only last 2 minutes)
-    for old_key in list(request_counts.keys()):
-        old_minute = int(old_key.split("_")[-1])
-        if minute_window - old_minute > 1:
-            del request_counts[old_key]
 
-    return request_counts[key] <= 60
+def with_etag(response, etag):
+    """Attach an ETag; no-cache makes browsers revalidate it on every request"""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 @app.route("/test")
@@ -133,12 +234,10 @@ def update_topic():
                 429,
             )
 
-        # Register student if not exists
-        db.register_student(student_email, student_name)
-
-        # Update topic progress
-        progress_data = db.update_topic_progress(
-            student_email, syllabus_id, topic_id, is_completed
+        # Update topic progress, registering the student in the same
+        # transaction; rapid repeated clicks share one write
+        progress_data = toggle_coalescer.update(
+            student_email, syllabus_id, [(topic_id, is_completed)], student_name
         )
 
         return jsonify(
@@ -146,7 +245,7 @@ def update_topic():
                 "success": True,
                 "message": "Topic progress updated successfully",
                 "syllabus_id": syllabus_id,
-                "topics": [{"id": topic_id, "completed": is_completed}],
+                "topics": progress_data["topics"],
                 "overall_progress": {
                     "percentage": progress_data.get("progress_percentage"),
                     "completed": progress_data.get("completed_count"),
@@ -164,6 +263,106 @@ def update_topic():
         )
 
 
+# Upper bound on topic updates accepted by one /update-topics request
+MAX_BULK_TOPIC_UPDATES = 500
+
+
+@app.route(f"{BASE_URL}/update-topics", methods=["POST"])
+def update_topics():
+    """Apply several topic updates for one syllabus in a single transaction"""
+    try:
+        data = request.get_json()
+        if not data:
+            return (
+                jsonify({"success": False, "error": "Invalid JSON data"}),
+                400,
+            )
+
+        student_email = data.get("student_email")
+        student_name = data.get("student_name")
+        syllabus_id = data.get("syllabus_id")
+        updates = data.get("updates")
+
+        # Validate required parameters
+        if not all([student_email, student_name, syllabus_id, updates]):
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Missing required parameters: student_email, student_name, syllabus_id, updates",
+                    }
+                ),
+                400,
+            )
+
+        if not isinstance(updates, list) or len(updates) > MAX_BULK_TOPIC_UPDATES:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": f"updates must be a list of at most {MAX_BULK_TOPIC_UPDATES} items",
+                    }
+                ),
+                400,
+            )
+
+        topic_updates = []
+        for update in updates:
+            if not isinstance(update, dict) or not update.get("topic_id"):
+                return (
+                    jsonify(
+                        {
+                            "success": False,
+                            "error": "Each update needs a topic_id and is_completed",
+                        }
+                    ),
+                    400,
+                )
+            topic_updates.append(
+                (update["topic_id"], bool(update.get("is_completed", False)))
+            )
+
+        # Rate limiting
+        if not rate_limit_check(student_email):
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Rate limit exceeded. Please try again later.",
+                    }
+                ),
+                429,
+            )
+
+        # Apply all topic updates at once (registering the student in the
+        # same transaction), merged with any concurrent toggles
+        progress_data = toggle_coalescer.update(
+            student_email, syllabus_id, topic_updates, student_name
+        )
+
+        return jsonify(
+            {
+                "success": True,
+                "message": "Topic progress updated successfully",
+                "syllabus_id": syllabus_id,
+                "topics": progress_data["topics"],
+                "overall_progress": {
+                    "percentage": progress_data["progress_percentage"],
+                    "completed": progress_data["completed_count"],
+                    "total": progress_data["total_topics"],
+                },
+            }
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {"success": False, "error": f"Internal server error: {str(e)}"}
+            ),
+            500,
+        )
+
+
 @app.route(f"{BASE_URL}/student-progress", methods=["GET", "POST"])
 def get_student_progress():
     """Get individual student progress for a specific syllabus"""
@@ -285,9 +484,15 @@ def get_student_syllabuses():
                 429,
             )
 
+        etag = db.get_data_etag("assignments", "syllabuses")
+        if request.method == "GET":
+            not_modified = not_modified_response(etag)
+            if not_modified:
+                return not_modified
+
         syllabuses = db.get_student_syllabuses(student_email)
 
-        return jsonify({"success": True, "syllabuses": syllabuses})
+        return with_etag(jsonify({"success": True, "syllabuses": syllabuses}), etag)
 
     except Exception as e:
         return (
@@ -317,9 +522,109 @@ def get_all_progress():
                 429,
             )
 
-        students_progress = db.get_all_students_progress()
+        # Answered from the in-memory version before any database access
+        etag = db.get_data_etag("progress")
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        # Read the watermark first: changes committed while the listing is
+        # read are then sent again by the next delta, never missed
+        watermark = db.get_progress_watermark()
+
+        since = request.args.get("since")
+        if since:
+            try:
+                changes = db.get_all_students_progress(since=since)
+                return with_etag(
+                    jsonify(
+                        {"status": "success", "data": changes, "watermark": watermark, "full": False}
+                    ),
+                    etag,
+                )
+            except ValueError:
+                # Watermark from another database (e.g. before a restore):
+                # fall through to a full listing the client must replace its rows with
+                pass
+
+        try:
+            limit, after = get_page_request(key_length=4)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        if limit is None:
+            students_progress = db.get_all_students_progress()
+            return with_etag(
+                jsonify(
+                    {"status": "success", "data": students_progress, "watermark": watermark, "full": True}
+                ),
+                etag,
+            )
+
+        # Fetch one extra row to tell whether another page follows
+        students_progress = db.get_all_students_progress(limit=limit + 1, after=after)
+        next_cursor = None
+        if len(students_progress) > limit:
+            students_progress = students_progress[:limit]
+            last = students_progress[-1]
+            next_cursor = encode_page_cursor(
+                [last["name"], last["syllabus_name"], last["email"], last["syllabus_id"]]
+            )
 
-        return jsonify({"status": "success", "data": students_progress})
+        return with_etag(
+            jsonify(
+                {
+                    "status": "success",
+                    "data": students_progress,
+                    "next_cursor": next_cursor,
+                    "watermark": watermark,
+                    "full": True,
+                }
+            ),
+            etag,
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {"success": False, "error": f"Internal server error: {str(e)}"}
+            ),
+            500,
+        )
+
+
+@app.route(f"{BASE_URL}/analytics", methods=["GET"])
+def get_analytics():
+    """Get class progress statistics, optionally for one syllabus (teacher dashboard)"""
+    try:
+        # Rate limiting for teacher dashboard
+        if not rate_limit_check("teacher_dashboard"):
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Rate limit exceeded. Please try again later.",
+                    }
+                ),
+                429,
+            )
+
+        etag = db.get_data_etag(*db.DATA_FAMILIES)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+        syllabus_id = request.args.get("syllabus_id") or None
+        try:
+            active_days = int(request.args.get("active_days", 7))
+        except ValueError:
+            return jsonify({"success": False, "error": "active_days must be an integer"}), 400
+        if not 1 <= active_days <= 365:
+            return jsonify({"success": False, "error": "active_days must be between 1 and 365"}), 400
+
+        analytics = db.get_progress_analytics(syllabus_id, active_days)
+
+        return with_etag(jsonify({"status": "success", "data": analytics}), etag)
 
     except Exception as e:
         return (
@@ -346,9 +651,24 @@ def get_student_list():
                 429,
             )
 
-        students = db.get_student_list()
+        try:
+            limit, after = get_page_request(key_length=2)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
 
-        return jsonify({"status": "success", "data": students})
+        if limit is None:
+            students = db.get_student_list()
+            return jsonify({"status": "success", "data": students})
+
+        # Fetch one extra row to tell whether another page follows
+        students = db.get_student_list(limit=limit + 1, after=after)
+        next_cursor = None
+        if len(students) > limit:
+            students = students[:limit]
+            last = students[-1]
+            next_cursor = encode_page_cursor([last["name"], last["email"]])
+
+        return jsonify({"status": "success", "data": students, "next_cursor": next_cursor})
 
     except Exception as e:
         return (
@@ -375,9 +695,14 @@ def get_all_syllabuses():
                 429,
             )
 
+        etag = db.get_data_etag("syllabuses")
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
         syllabuses = db.get_all_syllabuses()
 
-        return jsonify({"status": "success", "data": syllabuses})
+        return with_etag(jsonify({"status": "success", "data": syllabuses}), etag)
 
     except Exception as e:
         return (
@@ -404,10 +729,15 @@ def get_syllabus_structure(syllabus_id):
                 429,
             )
 
+        etag = db.get_data_etag("syllabuses")
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
         syllabus_data = db.get_syllabus_structure(syllabus_id)
 
         if syllabus_data:
-            return jsonify({"status": "success", "data": syllabus_data})
+            return with_etag(jsonify({"status": "success", "data": syllabus_data}), etag)
         else:
             return (
                 jsonify({"status": "error", "message": "Syllabus not found"}),
@@ -540,6 +870,11 @@ def remove_syllabus():
 def get_syllabus():
     """Get syllabus data (backward compatibility - defaults to 0580)"""
     try:
+        etag = db.get_data_etag("syllabuses")
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
         syllabus_data = db.get_syllabus_structure("0580")
 
         if syllabus_data:
@@ -579,7 +914,7 @@ def get_syllabus():
             # Convert to list for frontend
             syllabus_data = list(chapters.values())
 
-            return jsonify({"status": "success", "data": syllabus_data})
+            return with_etag(jsonify({"status": "success", "data": syllabus_data}), etag)
         else:
             return (
                 jsonify({"status": "error", "message": "Syllabus not found"}),
@@ -595,12 +930,96 @@ def get_syllabus():
         )
 
 
+@app.route(f"{BASE_URL}/events", methods=["GET"])
+def stream_events():
+    """Server-Sent Events stream of committed progress changes (teacher dashboard)"""
+    try:
+        if not rate_limit_check("teacher_dashboard"):
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Rate limit exceeded. Please try again later.",
+                    }
+                ),
+                429,
+            )
+
+        try:
+            subscription = progress_events.subscribe()
+        except RuntimeError as e:
+            return jsonify({"success": False, "error": str(e)}), 503
+
+        def generate():
+            try:
+                # Ask the browser to wait 5 seconds before reconnecting
+                yield "retry: 5000\n\n"
+                while True:
+                    events, dropped = subscription.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+                    if dropped:
+                        # This client fell behind; it should catch up with ?since=
+                        yield f"event: resync\ndata: {json.dumps({'dropped': dropped})}\n\n"
+                    for event in events:
+                        yield (
+                            f"id: {event['id']}\n"
+                            f"event: {event['type']}\n"
+                            f"data: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+                        )
+                    if not events and not dropped:
+                        yield ": keepalive\n\n"
+            finally:
+                # Runs when the client disconnects and the generator is closed
+                subscription.close()
+
+        return Response(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {"success": False, "error": f"Internal server error: {str(e)}"}
+            ),
+            500,
+        )
+
+
+@app.route(f"{BASE_URL}/stats", methods=["GET"])
+def get_stats():
+    """Get internal cache counters (for monitoring)"""
+    try:
+        return jsonify(
+            {
+                "status": "success",
+                "data": {
+                    "syllabus_cache": db.get_syllabus_cache_stats(),
+                    "event_subscribers": progress_events.subscriber_count(),
+                    "toggle_coalescing": toggle_coalescer.get_stats(),
+                    "progress_writes": db.get_progress_write_stats(),
+                    "busy_retries": db.get_busy_retries(),
+                },
+            }
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {"success": False, "error": f"Internal server error: {str(e)}"}
+            ),
+            500,
+        )
+
+
 @app.route(f"{BASE_URL}/initialize", methods=["GET"])
 def initialize():
     """Initialize database (for testing)"""
     try:
-        # This will trigger database initialization
-        db.init_db()
+        # This will trigger database initialization; syllabus data is only
+        # re-seeded when its source files changed, unless force=true
+        force_seed = request.args.get("force", "").lower() == "true"
+        db.init_db(force_seed=force_seed)
 
         return jsonify(
             {
@@ -624,26 +1043,20 @@ def initialize():
 # Backup management endpoints
 @app.route(f"{BASE_URL}/backups", methods=["GET"])
 def list_backups():
-    """List all available backup files"""
+    """List all stored backups, newest first"""
     try:
-        backup_dir = "/home/zakir/igcse-tracker-backups"
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir, mode=0o755, exist_ok=True)
-
-        backups = []
-        for filename in os.listdir(backup_dir):
-            if filename.endswith(".db"):
-                filepath = os.path.join(backup_dir, filename)
-                stat = os.stat(filepath)
-                backups.append({
-                    "name": filename,
-                    "size": stat.st_size,
-                    "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
-
-        # Sort by modification time (newest first)
-        backups.sort(key=lambda x: x["modified"], reverse=True)
+        backups = [
+            {
+                "name": entry["name"],
+                "label": entry["label"],
+                "kind": entry["kind"],
+                "size": entry["size"],
+                "stored_size": entry["stored_size"],
+                "created": entry["created"],
+                "modified": entry["created"]
+            }
+            for entry in backup_store.list_backups()
+        ]
 
         return jsonify({"success": True, "backups": backups})
 
@@ -653,7 +1066,7 @@ def list_backups():
 
 @app.route(f"{BASE_URL}/backups/create", methods=["POST"])
 def create_backup():
-    """Create a new backup of the current database"""
+    """Start a background backup of the current database (poll /backups/jobs/<id>)"""
     try:
         data = request.get_json()
         if not data:
@@ -668,32 +1081,49 @@ def create_backup():
         if not backup_name:
             return jsonify({"success": False, "error": "Invalid backup name"}), 400
 
-        backup_dir = "/home/zakir/igcse-tracker-backups"
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir, mode=0o755, exist_ok=True)
-
-        # Add timestamp to filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{backup_name}_{timestamp}.db"
-        filepath = os.path.join(backup_dir, filename)
-
-        # Copy current database to backup
-        import shutil
-        shutil.copy2("igcse_progress.db", filepath)
+        # A "compress" field from older clients is ignored: every chunk in
+        # the store is compressed
+        job = backup_jobs.start_backup(backup_name)
 
         return jsonify({
             "success": True,
-            "message": f"Backup '{backup_name}' created successfully",
-            "filename": filename
-        })
+            "message": f"Backup '{backup_name}' started",
+            "filename": job["filename"],
+            "job_id": job["id"],
+            "job": job
+        }), 202
 
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to create backup: {str(e)}"}), 500
 
 
+@app.route(f"{BASE_URL}/backups/jobs", methods=["GET"])
+def list_backup_jobs():
+    """List recent backup jobs, newest first"""
+    try:
+        return jsonify({"success": True, "jobs": backup_jobs.list_jobs()})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to list backup jobs: {str(e)}"}), 500
+
+
+@app.route(f"{BASE_URL}/backups/jobs/<job_id>", methods=["GET"])
+def get_backup_job(job_id):
+    """Get the status and progress of a backup job"""
+    try:
+        job = backup_jobs.get_job(job_id)
+        if not job:
+            return jsonify({"success": False, "error": "Backup job not found"}), 404
+
+        return jsonify({"success": True, "job": job})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to get backup job: {str(e)}"}), 500
+
+
 @app.route(f"{BASE_URL}/backups/restore", methods=["POST"])
 def restore_backup():
-    """Restore database from a backup file"""
+    """Start a background restore of the database from a stored backup"""
     try:
         data = request.get_json()
         if not data:
@@ -703,32 +1133,19 @@ def restore_backup():
         if not filename:
             return jsonify({"success": False, "error": "Backup filename is required"}), 400
 
-        backup_dir = "/home/zakir/igcse-tracker-backups"
-        filepath = os.path.join(backup_dir, filename)
-
-        # Validate file exists and is a database file
-        if not os.path.exists(filepath):
-            return jsonify({"success": False, "error": "Backup file not found"}), 404
-
-        if not filename.endswith(".db"):
-            return jsonify({"success": False, "error": "Invalid backup file"}), 400
+        if not backup_store.has_backup(filename):
+            return jsonify({"success": False, "error": "Backup not found"}), 404
 
-        # Create a backup of current database before restoring
-        current_backup_path = f"igcse_progress_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        import shutil
-        shutil.copy2("igcse_progress.db", current_backup_path)
-
-        # Restore from backup
-        shutil.copy2(filepath, "igcse_progress.db")
-
-        # Reinitialize database connection
-        global db
-        db = DatabaseManager()
+        # The current database is saved, the backup validated and prepared,
+        # and only then swapped in; requests keep being served meanwhile
+        job = backup_jobs.start_restore(filename, db)
 
         return jsonify({
             "success": True,
-            "message": f"Database restored from backup '{filename}' successfully"
-        })
+            "message": f"Restore from backup '{filename}' started",
+            "job_id": job["id"],
+            "job": job
+        }), 202
 
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to restore backup: {str(e)}"}), 500
@@ -736,7 +1153,7 @@ def restore_backup():
 
 @app.route(f"{BASE_URL}/backups/delete", methods=["POST"])
 def delete_backup():
-    """Delete a backup file"""
+    """Delete a stored backup"""
     try:
         data = request.get_json()
         if not data:
@@ -746,18 +1163,12 @@ def delete_backup():
         if not filename:
             return jsonify({"success": False, "error": "Backup filename is required"}), 400
 
-        backup_dir = "/home/zakir/igcse-tracker-backups"
-        filepath = os.path.join(backup_dir, filename)
+        if not backup_store.has_backup(filename):
+            return jsonify({"success": False, "error": "Backup not found"}), 404
 
-        # Validate file exists and is a database file
-        if not os.path.exists(filepath):
-            return jsonify({"success": False, "error": "Backup file not found"}), 404
-
-        if not filename.endswith(".db"):
-            return jsonify({"success": False, "error": "Invalid backup file"}), 400
-
-        # Delete the backup file
-        os.remove(filepath)
+        # Chunks no other backup shares are swept up on the backup worker
+        backup_store.delete_backup(filename)
+        backup_jobs.start_garbage_collection()
 
         return jsonify({
             "success": True,
@@ -769,11 +1180,26 @@ def delete_backup():
 
 
 if __name__ == "__main__":
+    import sys
+    import time
+
+    if sys.argv[1:] == ["jobs"]:
+        # Background jobs only, for deployments served by a WSGI server
+        start_background_jobs()
+        while True:
+            time.sleep(3600)
+
     # Initialize database on startup
     db.init_db()
 
     # Get port from environment or default to 5000
     port = int(os.environ.get("PORT", 5000))
 
+    # The reloader runs this block in a watching parent process too; only
+    # the serving child (WERKZEUG_RUN_MAIN set) starts the background jobs
+    debug = True
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_jobs()
+
     # Run the application
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=debug)
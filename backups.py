@@ -0,0 +1,522 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from sqlite_pool import database_file_lock
+
+# Pages copied per backup step, and the pause between steps that leaves the
+# disk to live traffic (at 4 KiB pages: 1 MiB per step)
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+
+# Database snapshots are split into chunks of this size (a multiple of the
+# page size, so an updated page only changes the one chunk it falls in)
+CHUNK_SIZE = 64 * 1024
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 50
+
+# Plain backup files written before the chunk store existed
+LEGACY_BACKUP_EXTENSIONS = (".db", ".db.gz")
+
+# Retention periods understood by parse_retention_policy()
+RETENTION_PERIODS = {"hourly": 3600, "daily": 86400, "weekly": 7 * 86400}
+
+
+def backup_database(db_path, dest_path, progress=None):
+    """Copy a live SQLite database to dest_path with the online backup API.
+
+    The copy is taken in small steps and never blocks writers (WAL). The
+    source connection holds a read transaction for the whole copy: without
+    it, every commit by another connection restarts the backup from page
+    one, so under steady write traffic it would never finish. progress is
+    called with (pages_done, pages_total) after each step.
+    """
+    # The first read opens the WAL, so it happens under the lock as well
+    with database_file_lock(db_path):
+        src = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1")  # start the read snapshot
+        except BaseException:
+            src.close()
+            raise
+    dst = sqlite3.connect(dest_path)
+    try:
+        def on_step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+
+        src.backup(dst, pages=BACKUP_PAGES_PER_STEP, progress=on_step, sleep=BACKUP_STEP_SLEEP)
+        src.execute("COMMIT")
+    finally:
+        dst.close()
+        src.close()
+
+
+def extract_backup(backup_path, dest_path):
+    """Write the plain database file of a legacy .db or .db.gz backup to dest_path"""
+    if backup_path.endswith(".gz"):
+        with gzip.open(backup_path, "rb") as source, open(dest_path, "wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+    else:
+        shutil.copyfile(backup_path, dest_path)
+
+
+def parse_retention_policy(spec):
+    """Parse a policy like "hourly=24,daily=30" into [(period seconds, count)].
+
+    Raises ValueError for unknown periods or non-numeric counts.
+    """
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        period, _, count = entry.partition("=")
+        if period.strip() not in RETENTION_PERIODS or not count.strip().isdigit():
+            raise ValueError(f"Invalid retention entry: {entry!r}")
+        rules.append((RETENTION_PERIODS[period.strip()], int(count)))
+    return rules
+
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file and rename"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class BackupStore:
+    """Content-addressed store of database snapshots.
+
+    A snapshot is split into fixed-size chunks stored once each under
+    chunks/<sha256[:2]>/<sha256> (zlib-compressed), plus a manifest per
+    backup under manifests/ listing its chunk hashes, so unchanged parts
+    of the database cost nothing in later backups. index.json holds the
+    metadata of every backup; listings never scan the store.
+
+    Several processes may share a store, so every change is made under an
+    flock on store.lock and starts from the index as it is on disk.
+    """
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.chunk_dir = os.path.join(backup_dir, "chunks")
+        self.manifest_dir = os.path.join(backup_dir, "manifests")
+        self.index_path = os.path.join(backup_dir, "index.json")
+        self.lock_path = os.path.join(backup_dir, "store.lock")
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store lock, exclusive across threads and processes"""
+        os.makedirs(self.chunk_dir, mode=0o755, exist_ok=True)
+        os.makedirs(self.manifest_dir, mode=0o755, exist_ok=True)
+        # Each open() is its own flock holder, so threads exclude each other too
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_index(self):
+        """Return the index as stored in index.json (rebuilding it if missing)"""
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            with self._locked():
+                return self._load_index()
+
+    def _load_index(self):
+        """Read index.json, rebuilding it from the manifests if missing; needs the store lock"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        index = {}
+        for filename in os.listdir(self.manifest_dir):
+            if filename.endswith(".json"):
+                manifest = self._read_manifest(filename[: -len(".json")])
+                index[manifest["name"]] = self._index_entry(manifest)
+        self._save_index(index)
+        return index
+
+    def _save_index(self, index):
+        """Write index.json; needs the store lock"""
+        _write_atomic(self.index_path, json.dumps(index, indent=1).encode("utf-8"))
+
+    def _read_manifest(self, name):
+        """Load the manifest of a backup"""
+        with open(os.path.join(self.manifest_dir, f"{name}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _index_entry(manifest):
+        """Listing fields of a manifest (everything but the chunk list)"""
+        return {key: value for key, value in manifest.items() if key != "chunks"}
+
+    def _chunk_path(self, digest):
+        """Location of a chunk blob"""
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def list_backups(self):
+        """Return the metadata of all backups, newest first"""
+        entries = list(self._read_index().values())
+        return sorted(entries, key=lambda entry: entry["created_ts"], reverse=True)
+
+    def has_backup(self, name):
+        """True if a backup with this name exists"""
+        return name in self._read_index()
+
+    def add_backup(self, label, db_file, kind="manual", created_ts=None):
+        """Store a database file as a new backup; returns its index entry.
+
+        The store lock is held from the first chunk to the manifest, so
+        collect_garbage() never sweeps chunks this backup is about to use.
+        """
+        created_ts = created_ts or time.time()
+        created = datetime.fromtimestamp(created_ts)
+
+        with self._locked():
+            chunks = []
+            new_bytes = 0
+            with open(db_file, "rb") as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    digest = hashlib.sha256(data).hexdigest()
+                    chunks.append(digest)
+                    path = self._chunk_path(digest)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+                        compressed = zlib.compress(data, 6)
+                        _write_atomic(path, compressed)
+                        new_bytes += len(compressed)
+
+            index = self._load_index()
+            base_name = f"{label}_{created.strftime('%Y%m%d_%H%M%S')}"
+            name = base_name
+            suffix = 2
+            while name in index:
+                name = f"{base_name}-{suffix}"
+                suffix += 1
+
+            manifest = {
+                "name": name,
+                "label": label,
+                "kind": kind,
+                "created": created.isoformat(),
+                "created_ts": created_ts,
+                "size": os.path.getsize(db_file),
+                "stored_size": new_bytes,
+                "chunk_size": CHUNK_SIZE,
+                "chunk_count": len(chunks),
+                "chunks": chunks,
+            }
+            _write_atomic(
+                os.path.join(self.manifest_dir, f"{name}.json"),
+                json.dumps(manifest).encode("utf-8"),
+            )
+            index[name] = self._index_entry(manifest)
+            self._save_index(index)
+            return dict(index[name])
+
+    def restore_to(self, name, dest_path):
+        """Reassemble a backup's database file at dest_path"""
+        manifest = self._read_manifest(name)
+        with open(dest_path, "wb") as out:
+            for digest in manifest["chunks"]:
+                with open(self._chunk_path(digest), "rb") as f:
+                    data = zlib.decompress(f.read())
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise ValueError(f"Backup chunk {digest} is corrupt")
+                out.write(data)
+
+    def delete_backup(self, name):
+        """Remove a backup's manifest; its chunks go at the next collect_garbage()"""
+        with self._locked():
+            index = self._load_index()
+            if name not in index:
+                return False
+            del index[name]
+            self._save_index(index)
+            manifest_path = os.path.join(self.manifest_dir, f"{name}.json")
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            return True
+
+    def apply_retention(self, rules, now=None):
+        """Delete automatic backups not kept by the retention rules.
+
+        For each (period, count) rule, the newest backup in each of the last
+        `count` periods is kept, and the newest backup overall is always
+        kept. Manual backups are never deleted. Returns the deleted names.
+        """
+        now = now or time.time()
+        backups = [entry for entry in self.list_backups() if entry["kind"] == "auto"]
+        keep = {backups[0]["name"]} if backups else set()
+        for period, count in rules:
+            seen_periods = set()
+            for entry in backups:  # newest first
+                if now - entry["created_ts"] >= period * count:
+                    break
+                bucket = int(entry["created_ts"] // period)
+                if bucket not in seen_periods:
+                    seen_periods.add(bucket)
+                    keep.add(entry["name"])
+
+        deleted = [entry["name"] for entry in backups if entry["name"] not in keep]
+        for name in deleted:
+            self.delete_backup(name)
+        return deleted
+
+    def collect_garbage(self):
+        """Delete chunks that no manifest refers to; returns the number removed"""
+        with self._locked():
+            # The manifests on disk, not the index, decide what is in use
+            referenced = set()
+            for filename in os.listdir(self.manifest_dir):
+                if filename.endswith(".json"):
+                    referenced.update(self._read_manifest(filename[: -len(".json")])["chunks"])
+
+            removed = 0
+            for prefix in os.listdir(self.chunk_dir):
+                prefix_dir = os.path.join(self.chunk_dir, prefix)
+                for filename in os.listdir(prefix_dir):
+                    if filename not in referenced:
+                        os.remove(os.path.join(prefix_dir, filename))
+                        removed += 1
+            return removed
+
+    def import_legacy_files(self, scratch_path):
+        """Move plain .db/.db.gz backups in the backup directory into the store.
+
+        The original files are moved to imported/ rather than deleted.
+        Returns the names of the new backups.
+        """
+        names = []
+        if not os.path.isdir(self.backup_dir):
+            return names
+
+        for filename in sorted(os.listdir(self.backup_dir)):
+            path = os.path.join(self.backup_dir, filename)
+            if not filename.endswith(LEGACY_BACKUP_EXTENSIONS) or not os.path.isfile(path):
+                continue
+
+            label = filename[: -len(".gz")] if filename.endswith(".gz") else filename
+            label = label[: -len(".db")]
+            extract_backup(path, scratch_path)
+            try:
+                entry = self.add_backup(label, scratch_path, created_ts=os.path.getmtime(path))
+            finally:
+                os.remove(scratch_path)
+
+            imported_dir = os.path.join(self.backup_dir, "imported")
+            os.makedirs(imported_dir, mode=0o755, exist_ok=True)
+            os.replace(path, os.path.join(imported_dir, filename))
+            names.append(entry["name"])
+        return names
+
+
+class BackupJobs:
+    """Runs backups and restores one at a time on a background worker thread.
+
+    Each job gets an ID whose status and progress can be polled with
+    get_job() while the request that started it returns immediately.
+    """
+
+    def __init__(self, store, db_path, retention_rules=()):
+        self.store = store
+        self.db_path = db_path
+        self.retention_rules = list(retention_rules)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._scheduler = None
+
+    def start_backup(self, label, kind="manual"):
+        """Queue a backup of the live database; returns the new job"""
+        return self._submit("backup", self._run_backup, label=label, kind=kind)
+
+    def start_restore(self, name, manager):
+        """Queue a restore of a stored backup into manager's database; returns the new job"""
+        return self._submit(
+            "restore", lambda job_id: self._run_restore(job_id, manager), filename=name
+        )
+
+    def start_garbage_collection(self):
+        """Queue removal of chunks no backup refers to any more; returns the new job"""
+        return self._submit("cleanup", self._run_garbage_collection)
+
+    def start_schedule(self, interval_seconds):
+        """Take an automatic backup every interval_seconds (the retention policy applies)"""
+        if self._scheduler is not None or interval_seconds <= 0:
+            return
+
+        def schedule():
+            while True:
+                time.sleep(interval_seconds)
+                self.start_backup("auto", kind="auto")
+
+        self._scheduler = threading.Thread(target=schedule, name="backup-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def _submit(self, job_type, run, **fields):
+        """Register a job and queue run(job_id) on the worker thread"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "type": job_type,
+            "status": "queued",
+            "filename": None,
+            "pages_done": 0,
+            "pages_total": 0,
+            "progress": 0.0,
+            "error": None,
+            "created": datetime.now().isoformat(),
+            "finished": None,
+            **fields,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._prune_jobs()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run_worker, name="backup-worker", daemon=True
+                )
+                self._worker.start()
+        self._queue.put((job["id"], run))
+        return dict(job)
+
+    def get_job(self, job_id):
+        """Return a snapshot of a job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self):
+        """Return snapshots of all known jobs, newest first"""
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+    def _update_job(self, job_id, **changes):
+        """Apply changes to a job's status fields"""
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _finish_job(self, job_id, **changes):
+        """Mark a job as done"""
+        self._update_job(
+            job_id, status="done", progress=1.0, finished=datetime.now().isoformat(), **changes
+        )
+
+    def _prune_jobs(self):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished"]]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _run_worker(self):
+        """Run queued jobs one after another, forever"""
+        while True:
+            job_id, run = self._queue.get()
+            try:
+                self._update_job(job_id, status="running")
+                run(job_id)
+            except Exception as e:
+                self._update_job(
+                    job_id, status="failed", error=str(e), finished=datetime.now().isoformat()
+                )
+            finally:
+                self._queue.task_done()
+
+    def _scratch_path(self):
+        """Temporary path for a full database copy, next to the live database"""
+        return f"{self.db_path}.backup-{uuid.uuid4().hex}.tmp"
+
+    def _snapshot(self, label, kind="manual", job_id=None, progress=None):
+        """Copy the live database into the store; returns the new index entry"""
+        scratch_path = self._scratch_path()
+        try:
+            backup_database(self.db_path, scratch_path, progress)
+            if job_id:
+                self._update_job(job_id, status="storing")
+            return self.store.add_backup(label, scratch_path, kind=kind)
+        finally:
+            if os.path.exists(scratch_path):
+                os.remove(scratch_path)
+
+    def _run_backup(self, job_id):
+        """Snapshot the database into the store, then apply the retention policy"""
+        job = self.get_job(job_id)
+
+        def on_progress(pages_done, pages_total):
+            self._update_job(
+                job_id,
+                pages_done=pages_done,
+                pages_total=pages_total,
+                progress=round(pages_done / pages_total, 4) if pages_total else 1.0,
+            )
+
+        entry = self._snapshot(job["label"], job["kind"], job_id, on_progress)
+
+        expired = []
+        if job["kind"] == "auto" and self.retention_rules:
+            expired = self.store.apply_retention(self.retention_rules)
+            self.store.collect_garbage()
+        self._finish_job(
+            job_id, filename=entry["name"], stored_size=entry["stored_size"], expired=expired
+        )
+
+    def _run_restore(self, job_id, manager):
+        """Save the live database, prepare the backup off to the side, then swap it in"""
+        job = self.get_job(job_id)
+        # Next to the live file, so the final rename stays on one filesystem
+        staged_path = manager.db_path + ".restore-tmp"
+
+        try:
+            safety = self._snapshot("pre-restore")
+            self._update_job(job_id, status="validating", safety_backup=safety["name"])
+            self.store.restore_to(job["filename"], staged_path)
+            manager.prepare_database_file(staged_path)
+
+            self._update_job(job_id, status="swapping")
+            started = time.perf_counter()
+            manager.replace_database_file(staged_path)
+            swap_ms = round((time.perf_counter() - started) * 1000, 1)
+        except Exception:
+            for suffix in ("", "-wal", "-shm", ".lock"):
+                if os.path.exists(staged_path + suffix):
+                    os.remove(staged_path + suffix)
+            raise
+
+        self._finish_job(job_id, swap_ms=swap_ms)
+
+    def _run_garbage_collection(self, job_id):
+        """Sweep unreferenced chunks (on the worker, so no backup is half-stored)"""
+        self._finish_job(job_id, removed_chunks=self.store.collect_garbage())
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["import-legacy"] and len(sys.argv) == 3:
+        # One-off move of plain .db/.db.gz backups from older versions into the store
+        store = BackupStore(sys.argv[2])
+        scratch_path = os.path.join(sys.argv[2], f"import-{uuid.uuid4().hex}.tmp")
+        names = store.import_legacy_files(scratch_path)
+        print(f"Imported {len(names)} legacy backups")
+        for name in names:
+            print("   ", name)
+        sys.exit(0)
+
+    print("Usage: python backups.py import-legacy <backup dir>")
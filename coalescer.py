@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import Future, wait
+
+
+class ToggleCoalescer:
+    """Merges rapid topic updates of one student and syllabus into one write.
+
+    The first update for a (student, syllabus) pair waits `window` seconds;
+    updates for the same pair arriving meanwhile join its batch, which keeps
+    only the last state of each topic. The batch is then written with a
+    single call to submit_write(student_email, syllabus_id, updates,
+    student_name), which must return a Future of the
+    update_topics_progress() result, and every caller gets the progress
+    after the whole batch. A pair's next batch is only submitted once the
+    previous one has been resolved, so batches are applied in order.
+
+    With read_unchanged (same arguments, returning the progress or None),
+    an update arriving while the pair has no batch pending or in flight is
+    first checked against the stored state; if it would change nothing it
+    is answered right away without waiting out the window or queueing a
+    write.
+    """
+
+    def __init__(self, submit_write, window=0.1, read_unchanged=None):
+        self._submit_write = submit_write
+        self._read_unchanged = read_unchanged
+        self.window = window
+        # Batches still collecting updates during their window, per pair
+        self._pending = {}
+        # Latest batch handed to the writer and not yet resolved, per pair
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "writes": 0, "unchanged": 0}
+
+    def update(self, student_email, syllabus_id, updates, student_name=None):
+        """Apply (topic_id, is_completed) updates, coalesced with concurrent ones.
+
+        Returns the update_topics_progress() result, with "topics" holding
+        the final state of this call's topics.
+        """
+        key = (student_email, syllabus_id)
+        with self._lock:
+            self._stats["requests"] += 1
+            # A batch collecting updates or handed to the writer and not
+            # yet committed is about to change the stored state
+            idle = key not in self._pending and key not in self._in_flight
+
+        # Only an idle pair can be answered from the stored state; otherwise
+        # this update must be applied after the earlier ones
+        if idle and self._read_unchanged is not None:
+            progress = self._read_unchanged(student_email, syllabus_id, updates, student_name)
+            if progress is not None:
+                with self._lock:
+                    self._stats["unchanged"] += 1
+                return progress
+
+        with self._lock:
+            # Without a window every update is written as its own batch
+            batch = self._pending.get(key) if self.window > 0 else None
+            leader = batch is None
+            if leader:
+                batch = {"updates": {}, "name": None, "result": Future()}
+                if self.window > 0:
+                    self._pending[key] = batch
+            if student_name is not None:
+                batch["name"] = student_name
+            for topic_id, is_completed in updates:
+                # Re-insert so the batch keeps the order of the last updates
+                batch["updates"].pop(topic_id, None)
+                batch["updates"][topic_id] = bool(is_completed)
+
+        if leader:
+            self._flush(key, batch)
+
+        progress = batch["result"].result()
+        topic_ids = list(dict.fromkeys(topic_id for topic_id, _ in updates))
+        return {
+            **progress,
+            "topics": [
+                {"id": topic_id, "completed": batch["updates"][topic_id]}
+                for topic_id in topic_ids
+            ],
+        }
+
+    def _flush(self, key, batch):
+        """Wait out the window, then write the batch and resolve its result"""
+        if self.window > 0:
+            time.sleep(self.window)
+        with self._lock:
+            # Later updates start a new batch
+            if self._pending.get(key) is batch:
+                del self._pending[key]
+            previous = self._in_flight.get(key)
+            self._in_flight[key] = batch
+            self._stats["writes"] += 1
+
+        # Batches of one pair are written one after another, in order; the
+        # lock is not held meanwhile, so a slow write (e.g. committed inline
+        # with WRITE_BATCH_SIZE=1) never holds up other pairs
+        if previous is not None:
+            wait([previous["result"]])
+        try:
+            future = self._submit_write(*key, list(batch["updates"].items()), batch["name"])
+            batch["result"].set_result(future.result())
+        except Exception as e:
+            batch["result"].set_exception(e)
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is batch:
+                    del self._in_flight[key]
+
+    def get_stats(self):
+        """Return request, write and unchanged (answered without a write) counters"""
+        with self._lock:
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "window_ms": self.window * 1000,
+            }
@@ -1,19 +1,549 @@
 import sqlite3
 import os
+import functools
 import json
-from datetime import datetime
-from template_converter import get_all_syllabus_data
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from events import progress_events
+from sqlite_pool import ConnectionPool, database_file_lock
+from template_converter import get_all_syllabus_data, get_syllabus_sources_hash
+from topic_archive import write_archive
+
+# SQL comment marking queries that read a whole table on purpose (listings,
+# migrations); check_query_plans() does not report full scans in them
+FULL_SCAN_MARKER = "-- full scan:"
+
+
+class _TrackedConnection(sqlite3.Connection):
+    """SQLite connection that remembers which database file it opened"""
+
+    file_id = None
+
+
+def _file_id(path):
+    """Return the (device, inode) pair that identifies the file at path"""
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def _is_busy_error(error):
+    """True if an sqlite3 error means the database is busy (SQLITE_BUSY)"""
+    # The error code attributes (and sqlite3.SQLITE_BUSY) are Python 3.11+;
+    # before that, only the message tells
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF == sqlite3.SQLITE_BUSY
+    message = str(error)
+    return "database is locked" in message or "busy" in message
+
+
+def _group_committed(method):
+    """Run a DatabaseManager write method through submit_write() and wait for it"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.submit_write(method, self, *args, **kwargs).result()
+
+    return wrapper
 
 
 class DatabaseManager:
-    def __init__(self, db_path="igcse_progress.db"):
+    # Per-connection tuning applied to every pooled connection. WAL lets readers
+    # and the single writer proceed concurrently, and synchronous=NORMAL only
+    # fsyncs on checkpoints instead of on every commit.
+    CONNECTION_PRAGMAS = (
+        ("synchronous", "NORMAL"),
+        ("cache_size", -16000),  # negative value = KiB, so ~16 MB page cache
+        ("mmap_size", 64 * 1024 * 1024),
+        ("busy_timeout", 5000),  # milliseconds to wait on a locked database
+        ("temp_store", "MEMORY"),
+    )
+
+    # Idle connections kept around for reuse; extra ones are closed on release
+    MAX_IDLE_CONNECTIONS = 8
+
+    # When BEGIN still finds the database locked after busy_timeout (another
+    # process holding the write lock), it is retried this many times, waiting
+    # BUSY_RETRY_DELAY seconds, doubled after each attempt, with jitter
+    BUSY_RETRIES = 5
+    BUSY_RETRY_DELAY = 0.05
+
+    # Schema migrations applied in order by _run_migrations(). The position in
+    # this list (1-based) is the schema version stored in PRAGMA user_version,
+    # so new migrations must only ever be appended.
+    SCHEMA_MIGRATIONS = (
+        "_migrate_completed_topics_to_table",
+        "_migrate_add_progress_weight_counters",
+        "_migrate_add_secondary_indexes",
+        "_migrate_add_topic_chapter_number",
+        "_migrate_add_student_listing_index",
+        "_migrate_add_progress_change_log",
+        "_migrate_add_topic_completion_syllabus_index",
+        "_migrate_add_data_versions",
+    )
+
+    # Resource families with their own data version: syllabus content,
+    # student-syllabus assignments and progress rows
+    DATA_FAMILIES = ("syllabuses", "assignments", "progress")
+
+    # Students whose stored name is remembered (see _ensure_student)
+    MAX_KNOWN_STUDENTS = 100000
+
+    # Upper bounds (inclusive) of the progress histogram buckets in analytics
+    ANALYTICS_HISTOGRAM_BOUNDS = (25, 50, 75, 100)
+
+    def __init__(self, db_path="igcse_progress.db", event_bus=None,
+                 write_batch_size=64, write_batch_window=0.0):
         self.db_path = db_path
+        # EventBus that committed changes are published to (None: no events)
+        self.event_bus = event_bus
+
+        # Group commit: writes are applied by one writer thread, up to
+        # write_batch_size per transaction, waiting at most write_batch_window
+        # seconds for a batch to fill (see submit_write). A batch size of 1
+        # commits each write on the calling thread instead.
+        self.write_batch_size = write_batch_size
+        self.write_batch_window = write_batch_window
+        self._write_queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        # Syllabuses data version the syllabus cache was last checked
+        # against (see get_data_etag)
+        self._syllabus_data_version = None
+        self._data_version_lock = threading.Lock()
+
+        self._local = threading.local()
+        self._pool = ConnectionPool(self._open_connection, self.MAX_IDLE_CONNECTIONS)
+        self._busy_retries = 0
+        self._busy_retries_lock = threading.Lock()
+
+        # Gate that lets replace_database_file() wait for running
+        # transactions to finish and hold new ones back during the swap
+        self._gate = threading.Condition()
+        self._active_transactions = 0
+        self._swap_owner = None
+
+        # In-process cache of static syllabus data, keyed by syllabus ID
+        self._syllabus_cache = {}
+        self._syllabus_list_cache = None
+        self._syllabus_cache_generation = 0
+        self._syllabus_cache_lock = threading.Lock()
+        self._syllabus_cache_stats = {"hits": 0, "misses": 0}
+
+        # Stored name of recently seen students (email -> name), so repeat
+        # requests skip the students upsert; least recently used first
+        self._known_students = OrderedDict()
+        self._known_students_lock = threading.Lock()
+
+        # Outcomes of progress updates (see get_progress_write_stats)
+        self._progress_write_stats = {"written": 0, "unchanged": 0, "short_circuited": 0}
+        self._progress_write_stats_lock = threading.Lock()
+
+        # Analytics results for the current data versions: (etag, {key: result})
+        self._analytics_cache = (None, {})
+        self._analytics_cache_lock = threading.Lock()
+
         self.init_db()
 
-    def init_db(self):
-        """Initialize database tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    # ========== CONNECTION POOL ==========
+
+    def _open_connection(self):
+        """Open a new connection with WAL mode and the tuned pragmas applied"""
+        # Under the lock, the file cannot be replaced between the open and
+        # the first read (which opens the WAL)
+        with database_file_lock(self.db_path):
+            # isolation_level=None disables the sqlite3 module's implicit
+            # transactions; transaction() issues BEGIN/COMMIT explicitly instead
+            conn = sqlite3.connect(
+                self.db_path, isolation_level=None, check_same_thread=False,
+                factory=_TrackedConnection
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.file_id = _file_id(self.db_path)
+        for name, value in self.CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def close_connections(self):
+        """Close all idle pooled connections and retire the ones in use.
+
+        Connections currently checked out are closed when their transaction
+        ends instead of being returned to the pool.
+        """
+        self._pool.close_all()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Yield a cursor on this thread's pooled connection inside a transaction.
+
+        Write paths pass immediate=True so the write lock is taken up front
+        (waiting up to busy_timeout) instead of failing when a read snapshot
+        is upgraded. Nested use from the same thread joins the outer
+        transaction, so only the outermost block commits (or rolls back on
+        an exception).
+        """
+        local = self._local
+        if getattr(local, "depth", 0) > 0:
+            local.depth += 1
+            try:
+                yield local.conn.cursor()
+            finally:
+                local.depth -= 1
+            return
+
+        self._enter_gate()
+        try:
+            conn, generation, cursor = self._begin_on_current_file(immediate)
+        except BaseException:
+            self._leave_gate()
+            raise
+        local.conn = conn
+        local.depth = 1
+        local.after_commit = []
+        try:
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            after_commit = local.after_commit
+        finally:
+            local.depth = 0
+            local.conn = None
+            local.after_commit = []
+            self._pool.release(conn, generation)
+            self._leave_gate()
+
+        # Only announce changes once they are durable and visible to readers
+        for callback in after_commit:
+            callback()
+
+    def _begin_on_current_file(self, immediate):
+        """Check out a connection and start a transaction on it.
+
+        Returns (connection, pool generation, cursor). If another process has
+        swapped in a new database file (replace_database_file), the pooled
+        connections still point at the old one: they are closed, the caches
+        dropped, and the transaction starts on a fresh connection instead.
+        The check follows BEGIN, so a write transaction holds the lock that
+        the swapping process takes on the old file before the rename.
+        """
+        while True:
+            conn, generation = self._pool.acquire()
+            try:
+                cursor = conn.cursor()
+                self._begin(cursor, immediate)
+                if conn.file_id == _file_id(self.db_path):
+                    return conn, generation, cursor
+                conn.rollback()
+            except BaseException:
+                self._pool.release(conn, generation)
+                raise
+            self._pool.release(conn, generation)
+            self.close_connections()
+            self._reset_caches()
+
+    def _begin(self, cursor, immediate):
+        """Start a transaction, retrying with backoff while the database is busy"""
+        delay = self.BUSY_RETRY_DELAY
+        for attempt in range(self.BUSY_RETRIES + 1):
+            try:
+                cursor.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+                return
+            except sqlite3.OperationalError as e:
+                # Only SQLITE_BUSY (and its extended codes) is worth retrying
+                if attempt == self.BUSY_RETRIES or not _is_busy_error(e):
+                    raise
+            with self._busy_retries_lock:
+                self._busy_retries += 1
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+
+    def get_busy_retries(self):
+        """Return how many times a transaction start was retried on a busy database"""
+        with self._busy_retries_lock:
+            return self._busy_retries
+
+    def _enter_gate(self):
+        """Register a starting transaction, waiting while the database file is swapped"""
+        with self._gate:
+            while self._swap_owner not in (None, threading.get_ident()):
+                self._gate.wait()
+            self._active_transactions += 1
+
+    def _leave_gate(self):
+        """Register the end of a transaction"""
+        with self._gate:
+            self._active_transactions -= 1
+            if self._active_transactions == 0:
+                self._gate.notify_all()
+
+    def replace_database_file(self, new_path):
+        """Atomically replace the database file with new_path (e.g. a restore).
+
+        new_path must be a fully prepared database (see prepare_database_file)
+        on the same filesystem. New transactions wait while running ones
+        finish; then the pool is closed, the file is renamed into place and
+        the caches are reloaded before the waiting transactions proceed.
+
+        Other processes using the same file notice the swap when they next
+        start a transaction and reopen their connections (see
+        _begin_on_current_file). During the swap this process holds the
+        write lock on the old file, so no other process commits into it
+        once it is replaced.
+        """
+        with self._gate:
+            self._swap_owner = threading.get_ident()
+            try:
+                while self._active_transactions:
+                    self._gate.wait()
+
+                self.close_connections()
+                lock_conn = self._open_connection()
+                try:
+                    with database_file_lock(self.db_path, exclusive=True):
+                        self._begin(lock_conn.cursor(), immediate=True)
+                        # The old WAL must not be replayed into the new file.
+                        # Connections other processes still hold on the old
+                        # file keep their open handles to it.
+                        for suffix in ("-wal", "-shm"):
+                            if os.path.exists(self.db_path + suffix):
+                                os.remove(self.db_path + suffix)
+                        os.replace(new_path, self.db_path)
+                finally:
+                    # SQLite sees the file has moved and leaves the new
+                    # file's WAL alone on close
+                    lock_conn.close()
+
+                # The restored file has its own change epoch, so every ETag
+                # issued before no longer matches
+                self._reset_caches()
+                self.warm_syllabus_cache()
+            finally:
+                self._swap_owner = None
+                self._gate.notify_all()
+
+        if self.event_bus is not None:
+            # Every client's view of the data is now out of date
+            self.event_bus.publish("resync", {"reason": "restore"})
+
+    @classmethod
+    def prepare_database_file(cls, path):
+        """Validate a database file and bring it up to date for replace_database_file().
+
+        Raises ValueError if the file is corrupt or not a tracker database.
+        Runs the schema migrations (and re-seeding, if the syllabus sources
+        changed) on the file itself, so none of that work happens while the
+        live database is swapped.
+        """
+        conn = sqlite3.connect(path)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchall()
+            if result != [("ok",)]:
+                raise ValueError(f"Integrity check failed: {result[0][0]}")
+            has_students = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'"
+            ).fetchone()
+            if not has_students:
+                raise ValueError("Not a progress tracker database")
+        finally:
+            conn.close()
+
+        manager = cls(path)
+        # Watermarks issued for the current database mean nothing in this one
+        manager.start_new_change_epoch()
+        manager.close_connections()
+        os.remove(path + ".lock")
+
+        # Fold any remaining WAL content into the main file before it is moved
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+    def _reset_caches(self):
+        """Forget everything cached about the database file (it was replaced)"""
+        with self._known_students_lock:
+            self._known_students.clear()
+        self.invalidate_syllabus_cache()
+
+    def _after_commit(self, callback):
+        """Run callback once the current outermost transaction has committed"""
+        self._local.after_commit.append(callback)
+
+    def _queue_event(self, event_type, data):
+        """Publish an event when the current outermost transaction commits"""
+        if self.event_bus is not None:
+            self._after_commit(lambda: self.event_bus.publish(event_type, data))
+
+    # ========== GROUP COMMIT ==========
+
+    def submit_write(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) for the writer thread; returns a Future.
+
+        The writer runs each function inside a SAVEPOINT of a shared
+        transaction, so one failing write rolls back alone and its Future
+        gets the exception, while the others commit together. Futures are
+        resolved after the commit. Called inside a transaction (including
+        from a write function itself), func runs at once and joins it.
+        """
+        if self.write_batch_size <= 1 or getattr(self._local, "depth", 0) > 0:
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        future = Future()
+        self._write_queue.put((future, func, args, kwargs))
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="db-writer", daemon=True
+                )
+                self._writer.start()
+        return future
+
+    def _run_writer(self):
+        """Apply queued writes in batches, forever"""
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + self.write_batch_window
+            while len(batch) < self.write_batch_size:
+                # Take what is already queued; wait for more only within the window
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._write_queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply_write_batch(batch)
+
+    def _apply_write_batch(self, batch):
+        """Run a batch of queued writes in one transaction and resolve their futures"""
+        outcomes = []
+        try:
+            with self.transaction(immediate=True) as cursor:
+                after_commit = self._local.after_commit
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    callbacks = len(after_commit)
+                    cursor.execute("SAVEPOINT group_write")
+                    try:
+                        outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO group_write")
+                        # Events and version bumps of the undone write must not fire
+                        del after_commit[callbacks:]
+                        outcomes.append((future, None, e))
+                    cursor.execute("RELEASE group_write")
+        except Exception as e:
+            # BEGIN, the commit or an after-commit callback failed; report
+            # it to every write that has not been resolved
+            for future, _, _, _ in batch:
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # ========== DATA VERSIONS ==========
+
+    def _bump_data_version(self, *families):
+        """Bump the version of resource families in the current transaction.
+
+        The counters live in app_metadata, so every worker process sees a
+        commit made by any of them, and the bump commits (or rolls back)
+        together with the change it labels.
+        """
+        self._local.conn.execute(
+            f"""
+            UPDATE app_metadata SET value = CAST(value AS INTEGER) + 1
+            WHERE key IN ({", ".join("?" * len(families))})
+            """,
+            [f"data_version:{family}" for family in families]
+        )
+
+    def get_data_etag(self, *families):
+        """Return an ETag value for data from the given resource families.
+
+        One primary-key read of app_metadata, shared by all worker
+        processes. The change epoch is replaced on restore, so ETags from
+        before a restore never match. Read it before querying the data, so
+        a concurrent write can only make the ETag older than the data.
+        """
+        keys = ["progress_change_epoch"] + [f"data_version:{family}" for family in self.DATA_FAMILIES]
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"SELECT key, value FROM app_metadata WHERE key IN ({', '.join('?' * len(keys))})",
+                keys
+            )
+            values = dict(cursor.fetchall())
+
+        # Another process may have re-seeded the syllabuses; drop this
+        # process's cached copy before it is served under the new version
+        syllabus_version = values["data_version:syllabuses"]
+        with self._data_version_lock:
+            changed = syllabus_version != self._syllabus_data_version
+            self._syllabus_data_version = syllabus_version
+        if changed:
+            self.invalidate_syllabus_cache()
+
+        versions = "-".join(str(values[f"data_version:{family}"]) for family in families)
+        return f"{values['progress_change_epoch'][:12]}-{versions}"
+
+    # ========== SCHEMA ==========
+
+    def init_db(self, force_seed=False):
+        """Initialize database tables if they don't exist.
+
+        Syllabus data is only re-seeded when the syllabus source files have
+        changed since the last seed (or when force_seed is set).
+        """
+        sources_hash = get_syllabus_sources_hash()
+
+        with self.transaction(immediate=True) as cursor:
+            self._create_tables(cursor)
+            self._run_migrations(cursor)
+
+            if force_seed or self._get_metadata(cursor, "syllabus_sources_hash") != sources_hash:
+                # Initialize syllabuses from template converter; topic weights
+                # may have changed, so bring the progress counters back in line
+                self.initialize_syllabuses(cursor)
+                self._recompute_progress(cursor)
+                self._set_metadata(cursor, "syllabus_sources_hash", sources_hash)
+                self._bump_data_version("syllabuses")
+
+        self.invalidate_syllabus_cache()
+        self.warm_syllabus_cache()
+
+    def _create_tables(self, cursor):
+        """Create the schema tables if they don't exist"""
+        # Key/value metadata (e.g. hash of the seeded syllabus sources)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS app_metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """
+        )
 
         # Students table
         cursor.execute(
@@ -59,6 +589,7 @@ class DatabaseManager:
                 id TEXT PRIMARY KEY,
                 variant_id TEXT NOT NULL,
                 chapter_name TEXT NOT NULL,
+                chapter_number INTEGER,
                 topic_name TEXT NOT NULL,
                 topic_number INTEGER,
                 weight INTEGER DEFAULT 1,
@@ -88,10 +619,12 @@ class DatabaseManager:
             CREATE TABLE IF NOT EXISTS student_progress (
                 student_email TEXT NOT NULL,
                 syllabus_id TEXT NOT NULL,
-                completed_topics TEXT, -- JSON array of completed topic IDs
+                completed_topics TEXT, -- legacy JSON array, migrated to student_topic_completion
                 progress_percentage REAL DEFAULT 0,
                 completed_count INTEGER DEFAULT 0,
                 total_topics INTEGER DEFAULT 0,
+                completed_weight INTEGER DEFAULT 0,
+                total_weight INTEGER DEFAULT 0,
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 PRIMARY KEY (student_email, syllabus_id),
                 FOREIGN KEY (student_email) REFERENCES students(email),
@@ -100,6 +633,35 @@ class DatabaseManager:
         """
         )
 
+        # Per-topic completion table - one row per completed topic
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS student_topic_completion (
+                student_email TEXT NOT NULL,
+                syllabus_id TEXT NOT NULL,
+                topic_id TEXT NOT NULL,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (student_email, syllabus_id, topic_id),
+                FOREIGN KEY (student_email) REFERENCES students(email),
+                FOREIGN KEY (syllabus_id) REFERENCES syllabuses(id)
+            ) WITHOUT ROWID
+        """
+        )
+
+        # Latest change sequence per (student, syllabus) row of the teacher
+        # listing; deleted=1 marks a removed assignment (tombstone)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS progress_changes (
+                student_email TEXT NOT NULL,
+                syllabus_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                deleted BOOLEAN NOT NULL DEFAULT 0,
+                PRIMARY KEY (student_email, syllabus_id)
+            ) WITHOUT ROWID
+        """
+        )
+
         # Topic updates log table - MODIFIED to support multiple syllabuses
         cursor.execute(
             """
@@ -116,359 +678,1200 @@ class DatabaseManager:
         """
         )
 
-        # Initialize syllabuses from template converter
-        self.initialize_syllabuses(cursor)
+        # Daily per-topic totals of compacted topic updates (see compact_topic_updates)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_topic_activity (
+                day TEXT NOT NULL,
+                syllabus_id TEXT NOT NULL,
+                topic_id TEXT NOT NULL,
+                completed_count INTEGER NOT NULL DEFAULT 0,
+                uncompleted_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, syllabus_id, topic_id)
+            ) WITHOUT ROWID
+        """
+        )
 
-        conn.commit()
-        conn.close()
+    def _run_migrations(self, cursor):
+        """Apply schema migrations newer than the stored schema version"""
+        cursor.execute("PRAGMA user_version")
+        current_version = cursor.fetchone()[0]
+
+        for version, method_name in enumerate(self.SCHEMA_MIGRATIONS, start=1):
+            if version <= current_version:
+                continue
+            getattr(self, method_name)(cursor)
+            # PRAGMA does not accept bound parameters
+            cursor.execute(f"PRAGMA user_version = {version}")
+
+    def _migrate_completed_topics_to_table(self, cursor):
+        """Migration 1: move completed_topics JSON arrays into student_topic_completion"""
+        cursor.execute(
+            """
+            SELECT student_email, syllabus_id, completed_topics
+            FROM student_progress
+            WHERE completed_topics IS NOT NULL
+            -- full scan: one-off migration of every progress row
+            """
+        )
+
+        rows = []
+        for student_email, syllabus_id, completed_topics_json in cursor.fetchall():
+            try:
+                completed_topics = json.loads(completed_topics_json)
+            except ValueError:
+                completed_topics = []
+            for topic_id in completed_topics:
+                rows.append((student_email, syllabus_id, topic_id))
+
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO student_topic_completion (student_email, syllabus_id, topic_id)
+            VALUES (?, ?, ?)
+            """,
+            rows
+        )
+
+        cursor.execute(
+            """
+            UPDATE student_progress SET completed_topics = NULL
+            -- full scan: one-off migration of every progress row
+            """
+        )
+
+    def _migrate_add_progress_weight_counters(self, cursor):
+        """Migration 2: add completed_weight/total_weight counters to student_progress"""
+        cursor.execute("PRAGMA table_info(student_progress)")
+        columns = {row[1] for row in cursor.fetchall()}
+
+        # Fresh databases already get these columns from CREATE TABLE
+        for column in ("completed_weight", "total_weight"):
+            if column not in columns:
+                cursor.execute(
+                    f"ALTER TABLE student_progress ADD COLUMN {column} INTEGER DEFAULT 0"
+                )
+
+        self._recompute_progress(cursor)
+
+    def _migrate_add_secondary_indexes(self, cursor):
+        """Migration 3: add indexes for the non-primary-key lookups and joins"""
+        for statement in (
+            # remove_student_from_syllabus deletes a student's log for a syllabus
+            "CREATE INDEX IF NOT EXISTS idx_topic_updates_student_syllabus "
+            "ON topic_updates (student_email, syllabus_id)",
+            # Syllabus topics are always reached through their variant
+            "CREATE INDEX IF NOT EXISTS idx_syllabus_topics_variant "
+            "ON syllabus_topics (variant_id, topic_number)",
+            "CREATE INDEX IF NOT EXISTS idx_syllabus_variants_syllabus "
+            "ON syllabus_variants (syllabus_id)",
+            # Assignments and progress rows looked up by syllabus alone
+            "CREATE INDEX IF NOT EXISTS idx_assignments_syllabus "
+            "ON student_syllabus_assignments (syllabus_id)",
+            "CREATE INDEX IF NOT EXISTS idx_student_progress_syllabus "
+            "ON student_progress (syllabus_id)",
+            # Student listings are ordered by name
+            "CREATE INDEX IF NOT EXISTS idx_students_name ON students (name)",
+        ):
+            cursor.execute(statement)
+
+    def _migrate_add_topic_chapter_number(self, cursor):
+        """Migration 4: store each topic's chapter number for structure ordering"""
+        cursor.execute("PRAGMA table_info(syllabus_topics)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "chapter_number" not in columns:
+            cursor.execute("ALTER TABLE syllabus_topics ADD COLUMN chapter_number INTEGER")
+
+        cursor.execute("DROP INDEX IF EXISTS idx_syllabus_topics_variant")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_syllabus_topics_variant_order "
+            "ON syllabus_topics (variant_id, chapter_number, topic_number)"
+        )
+
+        # Force init_db to re-seed, which fills chapter_number for every topic
+        cursor.execute("DELETE FROM app_metadata WHERE key = 'syllabus_sources_hash'")
+
+    def _migrate_add_student_listing_index(self, cursor):
+        """Migration 5: index students by (name, email) to serve keyset pagination"""
+        cursor.execute("DROP INDEX IF EXISTS idx_students_name")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_students_name_email ON students (name, email)"
+        )
+
+    def _migrate_add_progress_change_log(self, cursor):
+        """Migration 6: index the progress change log and start a watermark epoch"""
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_progress_changes_seq ON progress_changes (seq)"
+        )
+        self._set_metadata(cursor, "progress_change_epoch", uuid.uuid4().hex)
+
+    def _migrate_add_topic_completion_syllabus_index(self, cursor):
+        """Migration 7: index completed topics by syllabus for per-topic analytics"""
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_topic_completion_syllabus_topic "
+            "ON student_topic_completion (syllabus_id, topic_id)"
+        )
+
+    def _migrate_add_data_versions(self, cursor):
+        """Migration 8: keep the ETag version counters in app_metadata"""
+        cursor.executemany(
+            "INSERT OR IGNORE INTO app_metadata (key, value) VALUES (?, '0')",
+            [(f"data_version:{family}",) for family in self.DATA_FAMILIES]
+        )
 
     def initialize_syllabuses(self, cursor):
         """Initialize syllabuses from template converter data"""
         syllabus_data = get_all_syllabus_data()
 
+        syllabus_rows, variant_rows, topic_rows = [], [], []
         for syllabus_id, syllabus in syllabus_data.items():
-            # Insert syllabus
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO syllabuses (id, name, description)
-                VALUES (?, ?, ?)
-                """,
+            syllabus_rows.append(
                 (syllabus_id, syllabus['name'], syllabus.get('description', ''))
             )
 
-            # Insert variants and topics
             for variant_id, variant in syllabus['variants'].items():
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO syllabus_variants (id, syllabus_id, name, description)
-                    VALUES (?, ?, ?, ?)
-                    """,
+                variant_rows.append(
                     (variant_id, syllabus_id, variant['name'], variant.get('description', ''))
                 )
 
-                # Insert topics
                 for topic in variant['topics']:
-                    cursor.execute(
-                        """
-                        INSERT OR REPLACE INTO syllabus_topics
-                        (id, variant_id, chapter_name, topic_name, topic_number, weight)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (topic['id'], variant_id, topic['chapter_name'],
+                    topic_rows.append(
+                        (topic['id'], variant_id, topic['chapter_name'], topic.get('chapter_number'),
                          topic['topic_name'], topic['topic_number'], topic.get('weight', 1))
                     )
 
-    def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
-
-    def register_student(self, email, name):
-        """Register a new student or update existing"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
+        # Insert syllabuses
+        cursor.executemany(
             """
-            INSERT OR REPLACE INTO students (email, name)
-            VALUES (?, ?)
-        """,
-            (email, name),
+            INSERT OR REPLACE INTO syllabuses (id, name, description)
+            VALUES (?, ?, ?)
+            """,
+            syllabus_rows
         )
 
-        # Automatically assign student to contact syllabus
-        cursor.execute(
+        # Insert variants
+        cursor.executemany(
             """
-            INSERT OR IGNORE INTO student_syllabus_assignments (student_email, syllabus_id)
-            VALUES (?, 'contact')
+            INSERT OR REPLACE INTO syllabus_variants (id, syllabus_id, name, description)
+            VALUES (?, ?, ?, ?)
             """,
-            (email,)
+            variant_rows
         )
 
-        conn.commit()
-        conn.close()
+        # Insert topics
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO syllabus_topics
+            (id, variant_id, chapter_name, chapter_number, topic_name, topic_number, weight)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            topic_rows
+        )
 
-    def assign_student_to_syllabus(self, student_email, syllabus_id):
-        """Assign a student to a syllabus"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _get_metadata(self, cursor, key):
+        """Read a value from the app_metadata table"""
+        cursor.execute("SELECT value FROM app_metadata WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
 
+    def _set_metadata(self, cursor, key, value):
+        """Write a value to the app_metadata table"""
         cursor.execute(
-            """
-            INSERT OR REPLACE INTO student_syllabus_assignments (student_email, syllabus_id)
-            VALUES (?, ?)
-            """,
-            (student_email, syllabus_id)
+            "INSERT OR REPLACE INTO app_metadata (key, value) VALUES (?, ?)",
+            (key, value)
         )
 
-        conn.commit()
-        conn.close()
+    # ========== STUDENTS & ASSIGNMENTS ==========
 
+    def register_student(self, email, name):
+        """Register a new student or update existing"""
+        if not self._is_known_student(email, name):
+            self._register_student(email, name)
+
+    @_group_committed
+    def _register_student(self, email, name):
+        """Write the student row (see _ensure_student) in its own transaction"""
+        with self.transaction(immediate=True) as cursor:
+            self._ensure_student(cursor, email, name)
+
+    def _ensure_student(self, cursor, email, name):
+        """Insert a student, or rename them, only if the stored row differs.
+
+        A new student is also assigned to the contact syllabus. Students
+        found with this name are remembered once the transaction commits,
+        so later calls skip the database entirely.
+        """
+        if self._is_known_student(email, name):
+            return
+
+        cursor.execute("SELECT name FROM students WHERE email = ?", (email,))
+        existing = cursor.fetchone()
+
+        if existing is None:
+            cursor.execute("INSERT INTO students (email, name) VALUES (?, ?)", (email, name))
+            # Automatically assign student to contact syllabus
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO student_syllabus_assignments (student_email, syllabus_id)
+                VALUES (?, 'contact')
+                """,
+                (email,)
+            )
+        elif existing[0] != name:
+            # UPDATE rather than INSERT OR REPLACE keeps created_at
+            cursor.execute("UPDATE students SET name = ? WHERE email = ?", (name, email))
+
+        # A new student or a renamed one changes every listing row they have
+        if existing is None or existing[0] != name:
+            self._record_student_changes(cursor, email)
+            self._bump_data_version("assignments", "progress")
+        self._after_commit(lambda: self._remember_student(email, name))
+
+    def _is_known_student(self, email, name):
+        """True if the student is known to be stored with this name"""
+        with self._known_students_lock:
+            if self._known_students.get(email) != name:
+                return False
+            self._known_students.move_to_end(email)
+            return True
+
+    def _remember_student(self, email, name):
+        """Record a student's stored name, evicting the least recently seen beyond the limit"""
+        with self._known_students_lock:
+            self._known_students[email] = name
+            self._known_students.move_to_end(email)
+            if len(self._known_students) > self.MAX_KNOWN_STUDENTS:
+                self._known_students.popitem(last=False)
+
+    @_group_committed
+    def assign_student_to_syllabus(self, student_email, syllabus_id):
+        """Assign a student to a syllabus"""
+        with self.transaction(immediate=True) as cursor:
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO student_syllabus_assignments (student_email, syllabus_id)
+                VALUES (?, ?)
+                """,
+                (student_email, syllabus_id)
+            )
+            seq = self._record_progress_change(cursor, student_email, syllabus_id)
+            self._queue_event(
+                "assigned", {"email": student_email, "syllabus_id": syllabus_id, "seq": seq}
+            )
+            self._bump_data_version("assignments", "progress")
+
+    @_group_committed
     def remove_student_from_syllabus(self, student_email, syllabus_id):
         """Remove a student from a syllabus"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction(immediate=True) as cursor:
+            # Remove syllabus assignment
+            cursor.execute(
+                """
+                DELETE FROM student_syllabus_assignments
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (student_email, syllabus_id)
+            )
+
+            # Remove student progress for this syllabus
+            cursor.execute(
+                """
+                DELETE FROM student_progress
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (student_email, syllabus_id)
+            )
+
+            # Remove completed topics for this syllabus
+            cursor.execute(
+                """
+                DELETE FROM student_topic_completion
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (student_email, syllabus_id)
+            )
+
+            # Remove topic updates for this syllabus
+            cursor.execute(
+                """
+                DELETE FROM topic_updates
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (student_email, syllabus_id)
+            )
+
+            seq = self._record_progress_change(cursor, student_email, syllabus_id, deleted=True)
+            self._queue_event(
+                "removed", {"email": student_email, "syllabus_id": syllabus_id, "seq": seq}
+            )
+            self._bump_data_version("assignments", "progress")
+
+    def get_student_syllabuses(self, student_email):
+        """Get all syllabuses assigned to a student"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT s.id, s.name, s.description
+                FROM syllabuses s
+                JOIN student_syllabus_assignments sa ON s.id = sa.syllabus_id
+                WHERE sa.student_email = ?
+                ORDER BY s.name
+                """,
+                (student_email,)
+            )
+
+            syllabuses = []
+            for row in cursor.fetchall():
+                syllabuses.append({
+                    "id": row[0],
+                    "name": row[1],
+                    "description": row[2]
+                })
+        return syllabuses
+
+    # Bound parameters per IN (...) list; older SQLite builds cap a statement at 999
+    MAX_IN_CLAUSE_PARAMS = 500
+
+    def update_topic_progress(self, student_email, syllabus_id, topic_id, is_completed):
+        """Update individual topic progress for a specific syllabus"""
+        return self.update_topics_progress(
+            student_email, syllabus_id, [(topic_id, is_completed)]
+        )
+
+    @_group_committed
+    def update_topics_progress(self, student_email, syllabus_id, updates, student_name=None):
+        """Apply a batch of (topic_id, is_completed) updates for one syllabus in one transaction.
+
+        With a student_name, the student is registered (or renamed) in the
+        same transaction, as register_student() would. Updates that leave
+        every topic as it was write nothing and just return the progress.
+        """
+        final_states = self._final_topic_states(updates)
+
+        with self.transaction(immediate=True) as cursor:
+            if student_name is not None:
+                self._ensure_student(cursor, student_email, student_name)
+            self._ensure_progress_row(cursor, student_email, syllabus_id)
+
+            completed_before = self._get_completed_subset(
+                cursor, student_email, syllabus_id, list(final_states)
+            )
+            to_insert = [
+                topic_id for topic_id, is_completed in final_states.items()
+                if is_completed and topic_id not in completed_before
+            ]
+            to_delete = [
+                topic_id for topic_id, is_completed in final_states.items()
+                if not is_completed and topic_id in completed_before
+            ]
+
+            if not to_insert and not to_delete:
+                # Every topic is already in the requested state: no progress
+                # update, log entry, change record or event
+                self._record_progress_write("unchanged")
+                counters = self._read_progress_counters(cursor, student_email, syllabus_id)
+                return self._progress_result(counters, final_states)
+
+            cursor.executemany(
+                """
+                INSERT INTO student_topic_completion (student_email, syllabus_id, topic_id)
+                VALUES (?, ?, ?)
+                """,
+                [(student_email, syllabus_id, topic_id) for topic_id in to_insert]
+            )
+            cursor.executemany(
+                """
+                DELETE FROM student_topic_completion
+                WHERE student_email = ? AND syllabus_id = ? AND topic_id = ?
+                """,
+                [(student_email, syllabus_id, topic_id) for topic_id in to_delete]
+            )
+
+            # Adjust the counters by the topics whose state actually changed;
+            # topics outside this syllabus count with zero weight
+            weights = self._get_cached_syllabus(syllabus_id)["weights"]
+            delta_count = len(to_insert) - len(to_delete)
+            delta_weight = (
+                sum(weights.get(topic_id, 0) for topic_id in to_insert)
+                - sum(weights.get(topic_id, 0) for topic_id in to_delete)
+            )
+
+            cursor.execute(
+                """
+                UPDATE student_progress
+                SET completed_count = completed_count + ?,
+                    completed_weight = completed_weight + ?,
+                    progress_percentage = CASE WHEN total_weight > 0
+                        THEN (completed_weight + ?) * 100.0 / total_weight
+                        ELSE 0 END,
+                    last_updated = CURRENT_TIMESTAMP
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (delta_count, delta_weight, delta_weight, student_email, syllabus_id)
+            )
+
+            # Log the topic updates
+            cursor.executemany(
+                """
+                INSERT INTO topic_updates (student_email, syllabus_id, topic_id, is_completed)
+                VALUES (?, ?, ?, ?)
+                """,
+                [
+                    (student_email, syllabus_id, topic_id, is_completed)
+                    for topic_id, is_completed in final_states.items()
+                ],
+            )
+
+            seq = self._record_progress_change(cursor, student_email, syllabus_id)
+
+            counters = self._read_progress_counters(cursor, student_email, syllabus_id)
+            progress_percentage, completed_count, total_topics = counters
+            self._queue_event(
+                "progress",
+                {
+                    "email": student_email,
+                    "syllabus_id": syllabus_id,
+                    "progress_percentage": progress_percentage,
+                    "completed_count": completed_count,
+                    "total_topics": total_topics,
+                    "seq": seq,
+                },
+            )
+            self._bump_data_version("progress")
+            self._record_progress_write("written")
+
+        return self._progress_result(counters, final_states)
+
+    def get_unchanged_progress(self, student_email, syllabus_id, updates, student_name=None):
+        """Return the progress if the updates would change nothing, else None.
 
-        # Remove syllabus assignment
+        Only reads (no write lock or writer queue), so clients replaying
+        their state after a reconnect are answered at read cost. A student
+        not yet known under student_name always needs the write path.
+        """
+        if student_name is not None and not self._is_known_student(student_email, student_name):
+            return None
+
+        final_states = self._final_topic_states(updates)
+        with self.transaction() as cursor:
+            counters = self._read_progress_counters(cursor, student_email, syllabus_id)
+            if counters is None:
+                return None
+            completed = self._get_completed_subset(
+                cursor, student_email, syllabus_id, list(final_states)
+            )
+
+        if any(is_completed != (topic_id in completed) for topic_id, is_completed in final_states.items()):
+            return None
+        self._record_progress_write("short_circuited")
+        return self._progress_result(counters, final_states)
+
+    @staticmethod
+    def _final_topic_states(updates):
+        """Map each topic to its last requested state"""
+        # Only the last requested state of each topic matters
+        final_states = {}
+        for topic_id, is_completed in updates:
+            final_states[topic_id] = bool(is_completed)
+        return final_states
+
+    def _read_progress_counters(self, cursor, student_email, syllabus_id):
+        """Return (progress_percentage, completed_count, total_topics), or None without a row"""
         cursor.execute(
             """
-            DELETE FROM student_syllabus_assignments
+            SELECT progress_percentage, completed_count, total_topics
+            FROM student_progress
             WHERE student_email = ? AND syllabus_id = ?
             """,
             (student_email, syllabus_id)
         )
+        return cursor.fetchone()
 
-        # Remove student progress for this syllabus
+    @staticmethod
+    def _progress_result(counters, final_states):
+        """Build the update_topics_progress() result"""
+        progress_percentage, completed_count, total_topics = counters
+        return {
+            "progress_percentage": progress_percentage,
+            "completed_count": completed_count,
+            "total_topics": total_topics,
+            "topics": [
+                {"id": topic_id, "completed": is_completed}
+                for topic_id, is_completed in final_states.items()
+            ],
+        }
+
+    def _record_progress_write(self, outcome):
+        """Count a progress update outcome: written, unchanged or short_circuited"""
+        with self._progress_write_stats_lock:
+            self._progress_write_stats[outcome] += 1
+
+    def get_progress_write_stats(self):
+        """Return how many progress updates were written, found unchanged by the
+        writer, or answered without a write (short-circuited)"""
+        with self._progress_write_stats_lock:
+            return dict(self._progress_write_stats)
+
+    def _get_completed_subset(self, cursor, student_email, syllabus_id, topic_ids):
+        """Return the subset of topic_ids the student has already completed"""
+        completed = set()
+        for start in range(0, len(topic_ids), self.MAX_IN_CLAUSE_PARAMS):
+            chunk = topic_ids[start:start + self.MAX_IN_CLAUSE_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT topic_id FROM student_topic_completion
+                WHERE student_email = ? AND syllabus_id = ? AND topic_id IN ({placeholders})
+                """,
+                (student_email, syllabus_id, *chunk)
+            )
+            completed.update(row[0] for row in cursor.fetchall())
+        return completed
+
+    def _ensure_progress_row(self, cursor, student_email, syllabus_id):
+        """Create an empty progress row with the syllabus totals if none exists yet"""
         cursor.execute(
             """
-            DELETE FROM student_progress
+            SELECT 1 FROM student_progress
             WHERE student_email = ? AND syllabus_id = ?
             """,
             (student_email, syllabus_id)
         )
+        if cursor.fetchone():
+            return
 
-        # Remove topic updates for this syllabus
+        syllabus = self._get_cached_syllabus(syllabus_id)
         cursor.execute(
             """
-            DELETE FROM topic_updates
-            WHERE student_email = ? AND syllabus_id = ?
+            INSERT INTO student_progress
+            (student_email, syllabus_id, progress_percentage, completed_count, total_topics,
+             completed_weight, total_weight)
+            VALUES (?, ?, 0, 0, ?, 0, ?)
             """,
-            (student_email, syllabus_id)
+            (student_email, syllabus_id, syllabus["total_topics"], syllabus["total_weight"])
         )
 
-        conn.commit()
-        conn.close()
+    def recompute_progress(self, syllabus_id=None):
+        """Rebuild progress counters from scratch, e.g. after topic weights change"""
+        with self.transaction(immediate=True) as cursor:
+            self._recompute_progress(cursor, syllabus_id)
 
-    def get_student_syllabuses(self, student_email):
-        """Get all syllabuses assigned to a student"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _recompute_progress(self, cursor, syllabus_id=None):
+        """Recompute counters for one syllabus, or for every progress row"""
+        if syllabus_id:
+            where_clause, params = "WHERE syllabus_id = ?", (syllabus_id,)
+        else:
+            where_clause, params = f"{FULL_SCAN_MARKER} recompute every progress row", ()
 
         cursor.execute(
-            """
-            SELECT s.id, s.name, s.description
-            FROM syllabuses s
-            JOIN student_syllabus_assignments sa ON s.id = sa.syllabus_id
-            WHERE sa.student_email = ?
-            ORDER BY s.name
+            f"""
+            UPDATE student_progress
+            SET total_topics = (
+                    SELECT COUNT(*)
+                    FROM syllabus_topics st
+                    JOIN syllabus_variants sv ON st.variant_id = sv.id
+                    WHERE sv.syllabus_id = student_progress.syllabus_id
+                ),
+                total_weight = (
+                    SELECT COALESCE(SUM(st.weight), 0)
+                    FROM syllabus_topics st
+                    JOIN syllabus_variants sv ON st.variant_id = sv.id
+                    WHERE sv.syllabus_id = student_progress.syllabus_id
+                ),
+                completed_count = (
+                    SELECT COUNT(*)
+                    FROM student_topic_completion stc
+                    WHERE stc.student_email = student_progress.student_email
+                      AND stc.syllabus_id = student_progress.syllabus_id
+                ),
+                completed_weight = (
+                    SELECT COALESCE(SUM(st.weight), 0)
+                    FROM student_topic_completion stc
+                    JOIN syllabus_topics st ON st.id = stc.topic_id
+                    WHERE stc.student_email = student_progress.student_email
+                      AND stc.syllabus_id = student_progress.syllabus_id
+                )
+            {where_clause}
             """,
-            (student_email,)
+            params
         )
 
-        syllabuses = []
-        for row in cursor.fetchall():
-            syllabuses.append({
-                "id": row[0],
-                "name": row[1],
-                "description": row[2]
-            })
-
-        conn.close()
-        return syllabuses
-
-    def update_topic_progress(self, student_email, syllabus_id, topic_id, is_completed):
-        """Update individual topic progress for a specific syllabus"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Get current completed topics for this syllabus
+        # SET expressions see the old row values, so the percentage is a second pass
         cursor.execute(
-            """
-            SELECT completed_topics FROM student_progress
-            WHERE student_email = ? AND syllabus_id = ?
+            f"""
+            UPDATE student_progress
+            SET progress_percentage = CASE WHEN total_weight > 0
+                THEN completed_weight * 100.0 / total_weight
+                ELSE 0 END
+            {where_clause}
             """,
-            (student_email, syllabus_id)
+            params
         )
-        result = cursor.fetchone()
 
-        if result:
-            completed_topics = json.loads(result[0])
-        else:
-            completed_topics = []
+        self._record_syllabus_changes(cursor, syllabus_id)
+        self._bump_data_version("progress")
 
-        # Update completed topics list
-        if is_completed:
-            if topic_id not in completed_topics:
-                completed_topics.append(topic_id)
-        else:
-            if topic_id in completed_topics:
-                completed_topics.remove(topic_id)
+    def get_student_progress(self, student_email, syllabus_id):
+        """Get student's current progress for a specific syllabus"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT sp.progress_percentage, sp.completed_count, sp.total_topics
+                FROM student_progress sp
+                WHERE sp.student_email = ? AND sp.syllabus_id = ?
+                """,
+                (student_email, syllabus_id),
+            )
 
-        # Calculate new progress for this syllabus
-        syllabus_topics = self.get_syllabus_topics(syllabus_id)
-        total_weight = sum(topic["weight"] for topic in syllabus_topics)
-        completed_weight = sum(
-            topic["weight"]
-            for topic in syllabus_topics
-            if topic["id"] in completed_topics
-        )
+            result = cursor.fetchone()
+            if not result:
+                return None
 
-        progress_percentage = (
-            (completed_weight / total_weight * 100) if total_weight > 0 else 0
-        )
+            cursor.execute(
+                """
+                SELECT topic_id FROM student_topic_completion
+                WHERE student_email = ? AND syllabus_id = ?
+                """,
+                (student_email, syllabus_id),
+            )
+            completed_topics = {row[0] for row in cursor.fetchall()}
 
-        # Insert or update student progress for this syllabus
-        cursor.execute(
+        # Get syllabus with completion status
+        syllabus_with_status = []
+        for topic in self.get_syllabus_topics(syllabus_id):
+            syllabus_with_status.append(
+                {**topic, "completed": topic["id"] in completed_topics}
+            )
+
+        progress_percentage, completed_count, total_topics = result
+        return {
+            "progress_percentage": progress_percentage,
+            "completed_count": completed_count,
+            "total_topics": total_topics,
+            "syllabus": syllabus_with_status,
+        }
+
+    def get_all_students_progress(self, limit=None, after=None, since=None):
+        """Get progress data for all students across all syllabuses.
+
+        With a limit, returns one page ordered by (name, syllabus_name),
+        starting after the `after` key ([name, syllabus_name, email,
+        syllabus_id]) of the last row of the previous page.
+
+        With a `since` watermark (from get_progress_watermark()), returns only
+        the rows changed after it, each with a "deleted" flag; raises
+        ValueError if the watermark is stale or invalid.
+        """
+        if since is not None:
+            return self._get_progress_changes_since(since)
+
+        keyset_clause = ""
+        params = []
+        if after:
+            # The s.name bound lets the students(name, email) index skip
+            # straight to the page start; the row value breaks ties
+            keyset_clause = """
+                WHERE s.name >= ?
+                  AND (s.name, sy.name, s.email, sy.id) > (?, ?, ?, ?)
             """
-            INSERT OR REPLACE INTO student_progress
-            (student_email, syllabus_id, completed_topics, progress_percentage, completed_count, total_topics, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (
-                student_email,
-                syllabus_id,
-                json.dumps(completed_topics),
-                progress_percentage,
-                len(completed_topics),
-                len(syllabus_topics),
-            ),
+            params = [after[0], *after]
+        limit_clause = ""
+        if limit:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"""
+                SELECT s.email, s.name, sy.name as syllabus_name,
+                       sp.progress_percentage, sp.completed_count, sp.total_topics, sp.last_updated,
+                       sy.id
+                FROM students s
+                JOIN student_syllabus_assignments sa ON s.email = sa.student_email
+                JOIN syllabuses sy ON sa.syllabus_id = sy.id
+                LEFT JOIN student_progress sp ON s.email = sp.student_email AND sy.id = sp.syllabus_id
+                {keyset_clause}
+                ORDER BY s.name, sy.name, s.email, sy.id
+                {limit_clause}
+                """,
+                params
+            )
+
+            students = []
+            for row in cursor.fetchall():
+                students.append(
+                    {
+                        "email": row[0],
+                        "name": row[1],
+                        "syllabus_name": row[2],
+                        "progress_percentage": row[3] or 0,
+                        "completed_count": row[4] or 0,
+                        "total_topics": row[5] or 0,
+                        "last_updated": row[6],
+                        "syllabus_id": row[7],
+                    }
+                )
+        return students
+
+    def _get_progress_changes_since(self, since):
+        """Listing rows changed after a watermark, oldest change first"""
+        with self.transaction() as cursor:
+            since_seq = self._parse_watermark(cursor, since)
+            cursor.execute(
+                """
+                SELECT pc.student_email, s.name, sy.name as syllabus_name,
+                       sp.progress_percentage, sp.completed_count, sp.total_topics, sp.last_updated,
+                       pc.syllabus_id, pc.deleted OR sa.student_email IS NULL
+                FROM progress_changes pc
+                LEFT JOIN student_syllabus_assignments sa
+                    ON sa.student_email = pc.student_email AND sa.syllabus_id = pc.syllabus_id
+                LEFT JOIN students s ON s.email = pc.student_email
+                LEFT JOIN syllabuses sy ON sy.id = pc.syllabus_id
+                LEFT JOIN student_progress sp
+                    ON sp.student_email = pc.student_email AND sp.syllabus_id = pc.syllabus_id
+                WHERE pc.seq > ?
+                ORDER BY pc.seq
+                """,
+                (since_seq,)
+            )
+
+            changes = []
+            for row in cursor.fetchall():
+                if row[8]:
+                    # Rows no longer in the listing only need their key
+                    changes.append({"email": row[0], "syllabus_id": row[7], "deleted": True})
+                    continue
+                changes.append(
+                    {
+                        "email": row[0],
+                        "name": row[1],
+                        "syllabus_name": row[2],
+                        "progress_percentage": row[3] or 0,
+                        "completed_count": row[4] or 0,
+                        "total_topics": row[5] or 0,
+                        "last_updated": row[6],
+                        "syllabus_id": row[7],
+                        "deleted": False,
+                    }
+                )
+        return changes
+
+    def get_student_list(self, limit=None, after=None):
+        """Get list of all students.
+
+        With a limit, returns one page ordered by name, starting after the
+        `after` key ([name, email]) of the previous page.
+        """
+        keyset_clause = ""
+        params = []
+        if after:
+            keyset_clause = "WHERE (name, email) > (?, ?)"
+            params = list(after)
+        limit_clause = ""
+        if limit:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"""
+                SELECT email, name, created_at
+                FROM students
+                {keyset_clause}
+                ORDER BY name, email
+                {limit_clause}
+                """,
+                params
+            )
+
+            students = []
+            for row in cursor.fetchall():
+                students.append(
+                    {
+                        "email": row[0],
+                        "name": row[1],
+                        "created_at": row[2],
+                    }
+                )
+        return students
+
+    # ========== ANALYTICS ==========
+
+    def get_progress_analytics(self, syllabus_id=None, active_days=7):
+        """Return class statistics for one syllabus, or all of them.
+
+        For every syllabus (and "overall") this gives the number of students
+        and assignments, average and median progress, a histogram over
+        ANALYTICS_HISTOGRAM_BOUNDS and the number of students with progress
+        written in the last active_days days. With a syllabus_id, it also
+        gives each topic's completion rate. Results are cached until the
+        next progress, assignment or syllabus change.
+        """
+        # Read before querying, so a write during the query drops the result
+        etag = self.get_data_etag(*self.DATA_FAMILIES)
+        key = (syllabus_id, active_days)
+        with self._analytics_cache_lock:
+            cached_etag, results = self._analytics_cache
+            if cached_etag == etag and key in results:
+                return results[key]
+
+        active_since = (datetime.utcnow() - timedelta(days=active_days)).strftime("%Y-%m-%d %H:%M:%S")
+        with self.transaction() as cursor:
+            syllabuses = self._query_progress_summary(cursor, active_since, syllabus_id, True)
+            overall = self._query_progress_summary(cursor, active_since, syllabus_id, False)
+            if syllabus_id is not None:
+                cursor.execute(
+                    """
+                    SELECT topic_id, COUNT(*)
+                    FROM student_topic_completion
+                    WHERE syllabus_id = ?
+                    GROUP BY topic_id
+                    """,
+                    (syllabus_id,)
+                )
+                completed = dict(cursor.fetchall())
+
+        result = {
+            "overall": overall.get(None) or self._empty_progress_summary(),
+            "syllabuses": syllabuses,
+            "active_days": active_days,
+            "computed_at": datetime.now().isoformat(),
+        }
+        if syllabus_id is not None:
+            assignments = syllabuses.get(syllabus_id, {}).get("assignments", 0)
+            result["topics"] = [
+                {
+                    "topic_id": topic["id"],
+                    "chapter": topic["chapter"],
+                    "subchapter": topic["subchapter"],
+                    "completed": completed.get(topic["id"], 0),
+                    "completion_rate": round(
+                        completed.get(topic["id"], 0) * 100.0 / assignments, 2
+                    ) if assignments else 0,
+                }
+                for topic in self.get_syllabus_topics(syllabus_id)
+            ]
+
+        with self._analytics_cache_lock:
+            cached_etag, results = self._analytics_cache
+            if cached_etag != etag:
+                results = {}
+                self._analytics_cache = (etag, results)
+            # Unknown syllabus IDs are not cached, so request input cannot grow the cache
+            if syllabus_id is None or syllabus_id in syllabuses:
+                results[key] = result
+        return result
+
+    def _query_progress_summary(self, cursor, active_since, syllabus_id, per_syllabus):
+        """Aggregate assignment progress per syllabus (or overall, keyed None)"""
+        group = "sa.syllabus_id" if per_syllabus else "NULL"
+        where = "WHERE sa.syllabus_id = ?" if syllabus_id is not None else ""
+        marker = "" if syllabus_id is not None else f"{FULL_SCAN_MARKER} statistics over every assignment"
+        bounds = self.ANALYTICS_HISTOGRAM_BOUNDS
+        buckets = ", ".join(
+            f"SUM(pct > {low} AND pct <= {high})" if low else f"SUM(pct <= {high})"
+            for low, high in zip((0,) + bounds[:-1], bounds)
         )
 
-        # Log the topic update
+        # Students without a progress row count as 0%; the median averages
+        # the one or two middle rows of each group in progress order
         cursor.execute(
-            """
-            INSERT INTO topic_updates (student_email, syllabus_id, topic_id, is_completed)
-            VALUES (?, ?, ?, ?)
+            f"""
+            SELECT group_id, COUNT(DISTINCT student_email), COUNT(*), AVG(pct),
+                   AVG(CASE WHEN position IN ((group_size + 1) / 2, (group_size + 2) / 2)
+                            THEN pct END),
+                   COUNT(DISTINCT CASE WHEN last_updated >= ? THEN student_email END),
+                   {buckets}
+            FROM (
+                SELECT {group} AS group_id, sa.student_email,
+                       COALESCE(sp.progress_percentage, 0) AS pct, sp.last_updated,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY {group} ORDER BY COALESCE(sp.progress_percentage, 0)
+                       ) AS position,
+                       COUNT(*) OVER (PARTITION BY {group}) AS group_size
+                FROM student_syllabus_assignments sa
+                LEFT JOIN student_progress sp
+                    ON sp.student_email = sa.student_email AND sp.syllabus_id = sa.syllabus_id
+                {where}
+            )
+            GROUP BY group_id
+            {marker}
             """,
-            (student_email, syllabus_id, topic_id, is_completed),
+            [active_since] + ([syllabus_id] if syllabus_id is not None else [])
         )
 
-        conn.commit()
-        conn.close()
+        labels = [f"{low}-{high}" for low, high in zip((0,) + bounds[:-1], bounds)]
+        summaries = {}
+        for row in cursor.fetchall():
+            summaries[row[0]] = {
+                "students": row[1],
+                "assignments": row[2],
+                "average_progress": round(row[3] or 0, 2),
+                "median_progress": round(row[4] or 0, 2),
+                "active_students": row[5],
+                "histogram": dict(zip(labels, row[6:])),
+            }
+        return summaries
 
+    def _empty_progress_summary(self):
+        """Summary of a group without assignments"""
+        bounds = self.ANALYTICS_HISTOGRAM_BOUNDS
         return {
-            "progress_percentage": progress_percentage,
-            "completed_count": len(completed_topics),
-            "total_topics": len(syllabus_topics),
+            "students": 0,
+            "assignments": 0,
+            "average_progress": 0,
+            "median_progress": 0,
+            "active_students": 0,
+            "histogram": {f"{low}-{high}": 0 for low, high in zip((0,) + bounds[:-1], bounds)},
         }
 
-    def get_student_progress(self, student_email, syllabus_id):
-        """Get student's current progress for a specific syllabus"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    # ========== CHANGE LOG ==========
 
+    def _next_change_seq(self, cursor):
+        """Next value of the progress change sequence (an index lookup on seq)"""
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM progress_changes")
+        return cursor.fetchone()[0]
+
+    def _record_progress_change(self, cursor, student_email, syllabus_id, deleted=False):
+        """Mark one (student, syllabus) listing row as changed; returns its sequence number"""
+        seq = self._next_change_seq(cursor)
         cursor.execute(
             """
-            SELECT sp.progress_percentage, sp.completed_count, sp.total_topics, sp.completed_topics
-            FROM student_progress sp
-            WHERE sp.student_email = ? AND sp.syllabus_id = ?
+            INSERT OR REPLACE INTO progress_changes (student_email, syllabus_id, seq, deleted)
+            VALUES (?, ?, ?, ?)
             """,
-            (student_email, syllabus_id),
+            (student_email, syllabus_id, seq, deleted)
         )
+        return seq
 
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            (
-                progress_percentage,
-                completed_count,
-                total_topics,
-                completed_topics_json,
-            ) = result
-            completed_topics = json.loads(completed_topics_json)
-
-            # Get syllabus with completion status
-            syllabus_topics = self.get_syllabus_topics(syllabus_id)
-            syllabus_with_status = []
-            for topic in syllabus_topics:
-                syllabus_with_status.append(
-                    {**topic, "completed": topic["id"] in completed_topics}
-                )
-
-            return {
-                "progress_percentage": progress_percentage,
-                "completed_count": completed_count,
-                "total_topics": total_topics,
-                "syllabus": syllabus_with_status,
-            }
+    def _record_student_changes(self, cursor, student_email):
+        """Mark every listing row of one student as changed (e.g. after a rename)"""
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO progress_changes (student_email, syllabus_id, seq, deleted)
+            SELECT student_email, syllabus_id, ?, 0
+            FROM student_syllabus_assignments
+            WHERE student_email = ?
+            """,
+            (self._next_change_seq(cursor), student_email)
+        )
 
-        return None
+    def _record_syllabus_changes(self, cursor, syllabus_id=None):
+        """Mark every listing row of one syllabus (or of all syllabuses) as changed"""
+        if syllabus_id:
+            where_clause, params = "WHERE syllabus_id = ?", (syllabus_id,)
+        else:
+            where_clause, params = f"{FULL_SCAN_MARKER} every assignment changed", ()
 
-    def get_all_students_progress(self):
-        """Get progress data for all students across all syllabuses"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            INSERT OR REPLACE INTO progress_changes (student_email, syllabus_id, seq, deleted)
+            SELECT student_email, syllabus_id, ?, 0
+            FROM student_syllabus_assignments
+            {where_clause}
+            """,
+            (self._next_change_seq(cursor), *params)
+        )
 
+    def start_new_change_epoch(self):
+        """Invalidate every issued watermark, so delta-sync clients reload fully"""
+        with self.transaction(immediate=True) as cursor:
+            self._set_metadata(cursor, "progress_change_epoch", uuid.uuid4().hex)
+
+    def get_progress_watermark(self):
+        """Return the current change watermark ("<epoch>:<seq>") for delta sync"""
+        with self.transaction() as cursor:
+            epoch = self._get_metadata(cursor, "progress_change_epoch")
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM progress_changes")
+            return f"{epoch}:{cursor.fetchone()[0]}"
+
+    def _parse_watermark(self, cursor, watermark):
+        """Return the sequence number of a watermark; raises ValueError if it is
+        malformed or was issued by another database (e.g. before a restore)
+        """
+        epoch, _, seq = str(watermark).partition(":")
+        if epoch != self._get_metadata(cursor, "progress_change_epoch") or not seq.isdigit():
+            raise ValueError("Stale or invalid watermark")
+        return int(seq)
+
+    # ========== TOPIC UPDATE COMPACTION ==========
+
+    def compact_topic_updates(self, archive_dir, horizon_days=90, batch_size=1000,
+                              max_batches=None, pause=0.05):
+        """Move topic updates older than horizon_days out of topic_updates.
+
+        Each batch of at most batch_size rows (oldest first) is written to a
+        gzip archive file, added to the daily_topic_activity totals and
+        deleted, all inside one short write transaction; the write lock is
+        released for `pause` seconds between batches. Returns
+        {"archived": rows, "batches": count, "files": [paths]}.
+        """
+        # topic_updates timestamps are CURRENT_TIMESTAMP, i.e. UTC text
+        cutoff = (datetime.utcnow() - timedelta(days=horizon_days)).strftime("%Y-%m-%d %H:%M:%S")
+        result = {"archived": 0, "batches": 0, "files": []}
+
+        while max_batches is None or result["batches"] < max_batches:
+            with self.transaction(immediate=True) as cursor:
+                archived = self._archive_topic_update_batch(cursor, archive_dir, cutoff, batch_size)
+            if not archived:
+                break
+            result["archived"] += archived[0]
+            result["batches"] += 1
+            result["files"].append(archived[1])
+            time.sleep(pause)
+
+        return result
+
+    def _archive_topic_update_batch(self, cursor, archive_dir, cutoff, batch_size):
+        """Archive, roll up and delete one batch of old topic updates.
+
+        Returns (row count, archive path), or None if nothing is old enough.
+        """
+        # IDs grow with time, so the oldest rows are the lowest IDs; walking
+        # the primary key stops at the first row inside the horizon
         cursor.execute(
             """
-            SELECT s.email, s.name, sy.name as syllabus_name,
-                   sp.progress_percentage, sp.completed_count, sp.total_topics, sp.last_updated
-            FROM students s
-            JOIN student_syllabus_assignments sa ON s.email = sa.student_email
-            JOIN syllabuses sy ON sa.syllabus_id = sy.id
-            LEFT JOIN student_progress sp ON s.email = sp.student_email AND sy.id = sp.syllabus_id
-            ORDER BY s.name, sy.name
-            """
+            SELECT id, student_email, syllabus_id, topic_id, is_completed, timestamp
+            FROM topic_updates
+            -- full scan: bounded oldest-first walk of the primary key (LIMIT)
+            ORDER BY id
+            LIMIT ?
+            """,
+            (batch_size,)
         )
-
-        students = []
+        rows = []
         for row in cursor.fetchall():
-            students.append(
-                {
-                    "email": row[0],
-                    "name": row[1],
-                    "syllabus_name": row[2],
-                    "progress_percentage": row[3] or 0,
-                    "completed_count": row[4] or 0,
-                    "total_topics": row[5] or 0,
-                    "last_updated": row[6],
-                }
-            )
-
-        conn.close()
-        return students
+            if row[5] is None or row[5] >= cutoff:
+                break
+            rows.append(row)
+        if not rows:
+            return None
 
-    def get_student_list(self):
-        """Get list of all students"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        path = write_archive(archive_dir, rows)
 
-        cursor.execute(
-            """
-            SELECT email, name, created_at
-            FROM students
-            ORDER BY name
+        totals = {}
+        for _, _, syllabus_id, topic_id, is_completed, timestamp in rows:
+            counts = totals.setdefault((timestamp[:10], syllabus_id, topic_id), [0, 0])
+            counts[0 if is_completed else 1] += 1
+        cursor.executemany(
             """
+            INSERT INTO daily_topic_activity
+            (day, syllabus_id, topic_id, completed_count, uncompleted_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (day, syllabus_id, topic_id) DO UPDATE SET
+                completed_count = completed_count + excluded.completed_count,
+                uncompleted_count = uncompleted_count + excluded.uncompleted_count
+            """,
+            [key + tuple(counts) for key, counts in totals.items()]
         )
 
-        students = []
-        for row in cursor.fetchall():
-            students.append(
-                {"email": row[0], "name": row[1], "created_at": row[2]}
-            )
+        cursor.execute(
+            "DELETE FROM topic_updates WHERE id BETWEEN ? AND ?", (rows[0][0], rows[-1][0])
+        )
+        return len(rows), path
 
-        conn.close()
-        return students
+    # ========== SYLLABUS DATA (CACHED) ==========
 
     def get_all_syllabuses(self):
         """Get all available syllabuses"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, name, description
-            FROM syllabuses
-            ORDER BY name
-            """
-        )
+        syllabuses = self._syllabus_list_cache
+        if syllabuses is not None:
+            self._record_syllabus_cache_lookup(hit=True)
+            return syllabuses
+
+        self._record_syllabus_cache_lookup(hit=False)
+        generation = self._syllabus_cache_generation
+        with self.transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT id, name, description
+                FROM syllabuses
+                ORDER BY name
+                -- full scan: lists every syllabus
+                """
+            )
 
-        syllabuses = []
-        for row in cursor.fetchall():
-            syllabuses.append({
-                "id": row[0],
-                "name": row[1],
-                "description": row[2]
-            })
+            syllabuses = []
+            for row in cursor.fetchall():
+                syllabuses.append({
+                    "id": row[0],
+                    "name": row[1],
+                    "description": row[2]
+                })
 
-        conn.close()
+        with self._syllabus_cache_lock:
+            if generation == self._syllabus_cache_generation:
+                self._syllabus_list_cache = syllabuses
         return syllabuses
 
     def get_syllabus_topics(self, syllabus_id):
         """Get all topics for a syllabus (across all variants)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        syllabus = self._get_cached_syllabus(syllabus_id)
+        return syllabus["topics"]
+
+    def get_syllabus_structure(self, syllabus_id):
+        """Get syllabus structure with variants and topics for frontend"""
+        syllabus = self._get_cached_syllabus(syllabus_id)
+        return syllabus["structure"]
+
+    def get_syllabus_cache_stats(self):
+        """Return hit/miss counters and size of the syllabus cache"""
+        with self._syllabus_cache_lock:
+            return {
+                **self._syllabus_cache_stats,
+                "cached_syllabuses": len(self._syllabus_cache),
+            }
 
+    def invalidate_syllabus_cache(self):
+        """Drop all cached syllabus data; call after syllabus tables change"""
+        with self._syllabus_cache_lock:
+            self._syllabus_cache_generation += 1
+            self._syllabus_cache = {}
+            self._syllabus_list_cache = None
+
+    def warm_syllabus_cache(self):
+        """Load every syllabus into the cache"""
+        for syllabus in self.get_all_syllabuses():
+            self._get_cached_syllabus(syllabus["id"])
+
+    def _record_syllabus_cache_lookup(self, hit):
+        """Count a cache hit or miss"""
+        with self._syllabus_cache_lock:
+            self._syllabus_cache_stats["hits" if hit else "misses"] += 1
+
+    def _get_cached_syllabus(self, syllabus_id):
+        """Return the cached topics, weights and structure of a syllabus, loading it on a miss.
+
+        The returned data is shared between callers and must not be modified.
+        """
+        syllabus = self._syllabus_cache.get(syllabus_id)
+        if syllabus is not None:
+            self._record_syllabus_cache_lookup(hit=True)
+            return syllabus
+
+        self._record_syllabus_cache_lookup(hit=False)
+        generation = self._syllabus_cache_generation
+        with self.transaction() as cursor:
+            topics = self._query_syllabus_topics(cursor, syllabus_id)
+            structure = self._query_syllabus_structure(cursor, syllabus_id)
+
+        syllabus = {
+            "topics": topics,
+            "weights": {topic["id"]: topic["weight"] for topic in topics},
+            "total_topics": len(topics),
+            "total_weight": sum(topic["weight"] for topic in topics),
+            "structure": structure,
+        }
+
+        # Unknown IDs are not cached so arbitrary request input cannot grow
+        # the cache; an invalidation during the load discards the result
+        if structure is not None:
+            with self._syllabus_cache_lock:
+                if generation == self._syllabus_cache_generation:
+                    self._syllabus_cache[syllabus_id] = syllabus
+        return syllabus
+
+    def _query_syllabus_topics(self, cursor, syllabus_id):
+        """Load all topics for a syllabus (across all variants) from the database"""
         cursor.execute(
             """
             SELECT st.id, st.chapter_name, st.topic_name, st.topic_number, st.weight
@@ -488,59 +1891,44 @@ class DatabaseManager:
                 "subchapter": row[2],
                 "weight": row[4]
             })
-
-        conn.close()
         return topics
 
-    def get_syllabus_structure(self, syllabus_id):
-        """Get syllabus structure with variants and topics for frontend"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Get syllabus info
+    def _query_syllabus_structure(self, cursor, syllabus_id):
+        """Load syllabus structure with variants and topics from the database"""
+        # One ordered query for the syllabus, its variants and their topics;
+        # rows are grouped into variants below
         cursor.execute(
             """
-            SELECT name, description FROM syllabuses WHERE id = ?
+            SELECT s.name, s.description,
+                   sv.id, sv.name, sv.description,
+                   st.id, st.chapter_name, st.topic_name, st.topic_number, st.weight
+            FROM syllabuses s
+            LEFT JOIN syllabus_variants sv ON sv.syllabus_id = s.id
+            LEFT JOIN syllabus_topics st ON st.variant_id = sv.id
+            WHERE s.id = ?
+            ORDER BY sv.id, st.chapter_number, st.topic_number
             """,
             (syllabus_id,)
         )
-        syllabus_info = cursor.fetchone()
-        if not syllabus_info:
+        rows = cursor.fetchall()
+        if not rows:
             return None
 
-        # Get variants
-        cursor.execute(
-            """
-            SELECT id, name, description FROM syllabus_variants WHERE syllabus_id = ?
-            """,
-            (syllabus_id,)
-        )
-
         variants = {}
-        for row in cursor.fetchall():
-            variant_id, variant_name, variant_desc = row
-            variants[variant_id] = {
-                "id": variant_id,
-                "name": variant_name,
-                "description": variant_desc,
-                "topics": []
-            }
-
-        # Get topics for each variant
-        for variant_id in variants.keys():
-            cursor.execute(
-                """
-                SELECT id, chapter_name, topic_name, topic_number, weight
-                FROM syllabus_topics
-                WHERE variant_id = ?
-                ORDER BY CAST(SUBSTR(id, INSTR(id, '_') + 1, INSTR(SUBSTR(id, INSTR(id, '_') + 1), '_') - 1) AS INTEGER),
-                         topic_number
-                """,
-                (variant_id,)
-            )
+        for row in rows:
+            variant_id, variant_name, variant_desc = row[2:5]
+            if variant_id is None:
+                continue
+            if variant_id not in variants:
+                variants[variant_id] = {
+                    "id": variant_id,
+                    "name": variant_name,
+                    "description": variant_desc,
+                    "topics": []
+                }
 
-            for row in cursor.fetchall():
-                topic_id, chapter_name, topic_name, topic_number, weight = row
+            topic_id, chapter_name, topic_name, topic_number, weight = row[5:]
+            if topic_id is not None:
                 variants[variant_id]["topics"].append({
                     "id": topic_id,
                     "chapter_name": chapter_name,
@@ -549,15 +1937,52 @@ class DatabaseManager:
                     "weight": weight
                 })
 
-        conn.close()
-
         return {
             "id": syllabus_id,
-            "name": syllabus_info[0],
-            "description": syllabus_info[1],
+            "name": rows[0][0],
+            "description": rows[0][1],
             "variants": list(variants.values())
         }
 
 
-# Global database instance
-db = DatabaseManager()
\ No newline at end of file
+# Global database instance, created on first use (see __getattr__) so that
+# importing DatabaseManager does not open igcse_progress.db;
+# WRITE_BATCH_SIZE=1 turns group commit off
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """Return the global DatabaseManager, creating it on first use"""
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = DatabaseManager(
+                event_bus=progress_events,
+                write_batch_size=int(os.environ.get("WRITE_BATCH_SIZE", 64)),
+                write_batch_window=float(os.environ.get("WRITE_BATCH_WINDOW_MS", 0)) / 1000,
+            )
+        return _db
+
+
+def __getattr__(name):
+    # "from database import db" keeps working, building the instance lazily
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["compact"] and len(sys.argv) <= 4:
+        # Archive topic updates older than the horizon (default 90 days)
+        archive_dir = sys.argv[2] if len(sys.argv) > 2 else "topic_update_archive"
+        horizon_days = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+        result = get_db().compact_topic_updates(archive_dir, horizon_days)
+        print(f"Archived {result['archived']} topic updates in {result['batches']} batches")
+        for path in result["files"]:
+            print("   ", path)
+        sys.exit(0)
+
+    print("Usage: python database.py compact [archive dir] [horizon days]")
@@ -0,0 +1,91 @@
+import itertools
+import threading
+from collections import deque
+
+
+class Subscription:
+    """One subscriber's bounded event queue; the oldest events are dropped when full"""
+
+    def __init__(self, bus, max_queue):
+        self._bus = bus
+        self._events = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self._dropped = 0
+        self.closed = False
+
+    def _put(self, event):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Wait up to timeout seconds for events.
+
+        Returns (events, dropped): the queued events, oldest first, and how
+        many older events were discarded since the last call.
+        """
+        with self._condition:
+            if not self._events and not self.closed:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self._dropped = self._dropped, 0
+        return events, dropped
+
+    def close(self):
+        """Stop receiving events and wake up a waiting get()"""
+        self._bus._unsubscribe(self)
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class EventBus:
+    """In-process fan-out of events to every current subscriber.
+
+    publish() never blocks on slow subscribers: each one has its own bounded
+    queue, and a full queue drops its oldest event.
+    """
+
+    def __init__(self, max_queue=256, max_subscribers=100):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """Return a new Subscription; raises RuntimeError if there are too many"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise RuntimeError("Too many event subscribers")
+            subscription = Subscription(self, self.max_queue)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        """Remove a subscription (called by Subscription.close)"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type, data):
+        """Send an event to all subscribers; returns the event ID"""
+        with self._lock:
+            event_id = next(self._ids)
+            subscribers = list(self._subscribers)
+
+        event = {"id": event_id, "type": event_type, "data": data}
+        for subscription in subscribers:
+            subscription._put(event)
+        return event_id
+
+    def subscriber_count(self):
+        """Number of open subscriptions"""
+        with self._lock:
+            return len(self._subscribers)
+
+
+# Progress events published by the global DatabaseManager after each commit
+progress_events = EventBus()
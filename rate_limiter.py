@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_pool import ConnectionPool
+
+
+def parse_rate_limits(spec):
+    """Parse a limits spec like "update_topics=30/60,@teacher_dashboard=300/60".
+
+    Each entry is "<scope>@<principal>=<limit>/<window seconds>"; either the
+    scope (endpoint) or the "@principal" part may be left out. Returns a
+    list of (scope, principal, limit, window) tuples; raises ValueError.
+    """
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, value = entry.partition("=")
+        scope, _, principal = target.strip().partition("@")
+        limit, _, window = value.partition("/")
+        try:
+            rules.append((scope or None, principal or None, int(limit), float(window or 60)))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit entry: {entry!r}")
+    return rules
+
+
+def _within_limit(current, previous, limit, window, now):
+    """True if one more request fits the sliding-window estimate"""
+    elapsed_fraction = (now % window) / window
+    return previous * (1 - elapsed_fraction) + current + 1 <= limit
+
+
+class SlidingWindowRateLimiter:
+    """Thread-safe sliding-window rate limiter with O(1) work per request.
+
+    Each counter keeps only the request count of the current and previous
+    fixed window; the sliding-window estimate weights the previous count by
+    how much of it still overlaps the last `window` seconds. Counters are
+    kept in LRU order and the least recently used one is evicted beyond
+    max_keys, so memory stays bounded and stale counters expire lazily.
+    """
+
+    def __init__(self, limit=60, window=60.0, max_keys=100000, clock=time.monotonic):
+        self.default_rule = (limit, float(window))
+        self.max_keys = max_keys
+        self._clock = clock
+        self._rules = {}
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, limit, window=60.0, scope=None, principal=None):
+        """Set the limit for a scope (endpoint), a principal, or both.
+
+        Scoped rules get their own counter per principal; requests without
+        a scoped rule share the principal's default counter.
+        """
+        with self._lock:
+            self._rules[(scope, principal)] = (limit, float(window))
+
+    def _resolve(self, identifier, scope):
+        """Return (counter key, (limit, window)) for a request"""
+        rules = self._rules
+        if scope is not None:
+            rule = rules.get((scope, identifier)) or rules.get((scope, None))
+            if rule:
+                return (scope, identifier), rule
+        rule = rules.get((None, identifier)) or self.default_rule
+        return (None, identifier), rule
+
+    def check(self, identifier, scope=None):
+        """Count a request and return True if it is within the limit"""
+        now = self._clock()
+        with self._lock:
+            key, (limit, window) = self._resolve(identifier, scope)
+        return self._count(key, limit, window, now)
+
+    def _count(self, key, limit, window, now):
+        """Increment-and-check the counter of key; True if the request is allowed"""
+        window_index = int(now // window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = [window_index, 0, 0]  # window, current count, previous count
+                self._counters[key] = counter
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+                if counter[0] != window_index:
+                    # Roll forward; a gap of more than one window leaves nothing to carry
+                    counter[2] = counter[1] if window_index - counter[0] == 1 else 0
+                    counter[1] = 0
+                    counter[0] = window_index
+
+            if not _within_limit(counter[1], counter[2], limit, window, now):
+                return False
+            counter[1] += 1
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._counters)
+
+
+class SQLiteRateLimiter(SlidingWindowRateLimiter):
+    """Sliding-window rate limiter whose counters live in a shared SQLite file.
+
+    Every worker process that opens the same file enforces one combined
+    limit. Each check is a single BEGIN IMMEDIATE transaction (read, then
+    upsert the counter row), which SQLite serialises across processes.
+    The file uses WAL with synchronous=OFF: counters may lose their last
+    few increments on a power cut, which is harmless for rate limiting.
+    Expired rows are deleted lazily every CLEANUP_INTERVAL checks.
+    Connections are pooled rather than kept per thread, since the threaded
+    dev server starts a new thread for every request. If the file stays
+    locked (or is unusable), checks fail open: the limiter is not a
+    security boundary, so it must not turn into a 500 on every endpoint.
+    """
+
+    CLEANUP_INTERVAL = 1000
+    MAX_IDLE_CONNECTIONS = 8
+
+    def __init__(self, db_path, limit=60, window=60.0, clock=time.time):
+        # Counters are shared between processes, so the clock must be the
+        # wall clock rather than a per-process monotonic one
+        super().__init__(limit=limit, window=window, clock=clock)
+        self.db_path = db_path
+        self._pool = ConnectionPool(self._open_connection, self.MAX_IDLE_CONNECTIONS)
+        self._checks_until_cleanup = self.CLEANUP_INTERVAL
+        self.failed_open = 0
+
+        conn, generation = self._pool.acquire()
+        try:
+            self._create_table(conn)
+        finally:
+            self._pool.release(conn, generation)
+
+    def _create_table(self, conn):
+        """Create the counter table and its expiry index if missing"""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                scope TEXT NOT NULL,
+                principal TEXT NOT NULL,
+                window_index INTEGER NOT NULL,
+                current_count INTEGER NOT NULL,
+                previous_count INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (scope, principal)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limit_counters_expires "
+            "ON rate_limit_counters (expires_at)"
+        )
+
+    def _open_connection(self):
+        """Open a connection to the shared counter file with the pragmas applied"""
+        conn = sqlite3.connect(
+            self.db_path, isolation_level=None, timeout=5, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def _count(self, key, limit, window, now):
+        """Increment-and-check the shared counter of key in one write transaction"""
+        scope, principal = key[0] or "", key[1]
+        window_index = int(now // window)
+        try:
+            conn, generation = self._pool.acquire()
+        except sqlite3.OperationalError:
+            self.failed_open += 1
+            return True
+        try:
+            return self._count_in_transaction(
+                conn, scope, principal, limit, window, now, window_index
+            )
+        except sqlite3.OperationalError:
+            # Locked past the busy timeout (or unusable): allow the request
+            self.failed_open += 1
+            return True
+        finally:
+            self._pool.release(conn, generation)
+
+    def _count_in_transaction(self, conn, scope, principal, limit, window, now, window_index):
+        """Read, check and upsert one counter row in a BEGIN IMMEDIATE transaction"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT window_index, current_count, previous_count
+                FROM rate_limit_counters
+                WHERE scope = ? AND principal = ?
+                """,
+                (scope, principal)
+            ).fetchone()
+
+            current = previous = 0
+            if row:
+                if row[0] == window_index:
+                    current, previous = row[1], row[2]
+                elif window_index - row[0] == 1:
+                    previous = row[1]
+
+            allowed = _within_limit(current, previous, limit, window, now)
+            if allowed:
+                current += 1
+            if allowed or not row or row[0] != window_index:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO rate_limit_counters
+                    (scope, principal, window_index, current_count, previous_count, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (scope, principal, window_index, current, previous,
+                     (window_index + 2) * window)
+                )
+
+            self._checks_until_cleanup -= 1
+            if self._checks_until_cleanup <= 0:
+                self._checks_until_cleanup = self.CLEANUP_INTERVAL
+                conn.execute("DELETE FROM rate_limit_counters WHERE expires_at < ?", (now,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return allowed
+
+    def __len__(self):
+        conn, generation = self._pool.acquire()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM rate_limit_counters").fetchone()[0]
+        finally:
+            self._pool.release(conn, generation)
+
+
+def create_rate_limiter(limit=60, window=60.0):
+    """Build the app's rate limiter from the environment.
+
+    With RATE_LIMIT_DB set, counters are shared through that SQLite file
+    by every worker process; otherwise they are kept in this process.
+    RATE_LIMITS adds per-endpoint/principal rules (see parse_rate_limits).
+    """
+    db_path = os.environ.get("RATE_LIMIT_DB")
+    if db_path:
+        limiter = SQLiteRateLimiter(db_path, limit=limit, window=window)
+    else:
+        limiter = SlidingWindowRateLimiter(limit=limit, window=window)
+
+    for scope, principal, rule_limit, rule_window in parse_rate_limits(
+        os.environ.get("RATE_LIMITS", "")
+    ):
+        limiter.configure(rule_limit, rule_window, scope=scope, principal=principal)
+    return limiter
+
+
+def benchmark(identifiers=10000, requests=200000, db_path=None, thread_per_request=False):
+    """Time check() over many distinct identifiers; returns seconds per check.
+
+    With thread_per_request, every check runs on a new thread, as under the
+    threaded dev server; the cost of starting the threads is included.
+    """
+    if db_path:
+        limiter = SQLiteRateLimiter(db_path, limit=60, window=60)
+    else:
+        limiter = SlidingWindowRateLimiter(limit=60, window=60, max_keys=identifiers)
+    limiter.configure(30, 60, scope="update_topics")
+    keys = [f"student{i}@example.com" for i in range(identifiers)]
+
+    start = time.perf_counter()
+    for i in range(requests):
+        args = (keys[i % identifiers], "update_topics" if i % 2 else None)
+        if thread_per_request:
+            thread = threading.Thread(target=limiter.check, args=args)
+            thread.start()
+            thread.join()
+        else:
+            limiter.check(*args)
+    elapsed = time.perf_counter() - start
+    return elapsed / requests, len(limiter)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    # Usage: python rate_limiter.py [--sqlite] [identifiers] [requests]
+    args = sys.argv[1:]
+    use_sqlite = "--sqlite" in args
+    args = [arg for arg in args if arg != "--sqlite"]
+    identifiers = int(args[0]) if len(args) > 0 else 10000
+    requests = int(args[1]) if len(args) > 1 else (20000 if use_sqlite else 200000)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in sorted({100, identifiers}):
+            # One thread for all checks, then a new thread per check (as under
+            # the threaded dev server, thread start-up included)
+            for thread_per_request in (False, True):
+                db_path = (
+                    os.path.join(tmp_dir, f"limits_{count}_{int(thread_per_request)}.db")
+                    if use_sqlite else None
+                )
+                per_check, tracked = benchmark(
+                    count, min(requests, 5000) if thread_per_request else requests,
+                    db_path, thread_per_request,
+                )
+                print(
+                    f"{count:>7} identifiers: {per_check * 1e6:.2f} us per check "
+                    f"({tracked} counters tracked, {'sqlite' if use_sqlite else 'memory'}, "
+                    f"{'thread per request' if thread_per_request else 'one thread'})"
+                )
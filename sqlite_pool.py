@@ -0,0 +1,68 @@
+import fcntl
+import queue
+from contextlib import contextmanager
+
+
+@contextmanager
+def database_file_lock(db_path, exclusive=False):
+    """Hold the flock on db_path's lock file, shared unless exclusive.
+
+    Opening a connection (up to its first read, which opens the WAL) takes it
+    shared; replacing the database file takes it exclusively, so no process
+    opens the old file's WAL under the new file's name. The lock is
+    released when the block exits.
+    """
+    with open(db_path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of idle SQLite connections.
+
+    Connections move between threads, but only one thread uses a connection
+    at a time, so open_connection() must pass check_same_thread=False.
+    close_all() retires every connection: idle ones are closed at once, the
+    ones checked out when they are released.
+    """
+
+    def __init__(self, open_connection, max_idle=8):
+        self._open_connection = open_connection
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._generation = 0
+
+    def acquire(self):
+        """Return (connection, generation), reusing an idle connection if one is free"""
+        while True:
+            try:
+                conn, generation = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open_connection(), self._generation
+            if generation == self._generation:
+                return conn, generation
+            # Connection predates close_all(); discard it
+            conn.close()
+
+    def release(self, conn, generation):
+        """Return a connection to the pool, closing it if the pool is full or it is retired"""
+        if generation != self._generation:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait((conn, generation))
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection and retire the ones checked out"""
+        self._generation += 1
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+    def idle_count(self):
+        """Return the number of idle connections"""
+        return self._idle.qsize()
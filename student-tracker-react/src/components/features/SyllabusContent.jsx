@@ -5,6 +5,7 @@ function SyllabusContent({
   syllabusData,
   progressData = {},
   onTopicToggle,
+  onChapterToggle,
   disabled = false
 }) {
   const [expandedSections, setExpandedSections] = useState({})
@@ -53,24 +54,38 @@ function SyllabusContent({
                 isExpanded ? 'p-5' : 'max-h-0 p-0'
               }`}
             >
-              {Object.entries(chapters).map(([chapterName, topics]) => (
-                <div key={chapterName} className="border border-gray-200 rounded mb-4">
-                  <div className="chapter-header">
-                    {chapterName}
-                  </div>
-                  <div className="p-4">
-                    {topics.map(topic => (
-                      <TopicItem
-                        key={topic.id}
-                        topic={topic}
-                        isCompleted={progressData.topics?.[topic.id] || false}
-                        onToggle={onTopicToggle}
-                        disabled={disabled}
-                      />
-                    ))}
+              {Object.entries(chapters).map(([chapterName, topics]) => {
+                const chapterCompleted = topics.every(topic => progressData.topics?.[topic.id])
+
+                return (
+                  <div key={chapterName} className="border border-gray-200 rounded mb-4">
+                    <div className="chapter-header flex items-center">
+                      {onChapterToggle && (
+                        <input
+                          type="checkbox"
+                          checked={chapterCompleted}
+                          onChange={() => onChapterToggle(topics.map(topic => topic.id), !chapterCompleted)}
+                          disabled={disabled}
+                          className="topic-checkbox"
+                          aria-label={`Mark all of ${chapterName} as ${chapterCompleted ? 'not completed' : 'completed'}`}
+                        />
+                      )}
+                      {chapterName}
+                    </div>
+                    <div className="p-4">
+                      {topics.map(topic => (
+                        <TopicItem
+                          key={topic.id}
+                          topic={topic}
+                          isCompleted={progressData.topics?.[topic.id] || false}
+                          onToggle={onTopicToggle}
+                          disabled={disabled}
+                        />
+                      ))}
+                    </div>
                   </div>
-                </div>
-              ))}
+                )
+              })}
             </div>
           </div>
         )
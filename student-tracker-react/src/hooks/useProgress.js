@@ -4,6 +4,29 @@ const API_CONFIG = {
   BASE_URL: '/tracker'
 }
 
+// Progress data with the given topic states applied and the optimistic
+// overall progress recalculated from them
+function withTopicStates(prevData, states) {
+  const updatedTopics = {
+    ...prevData.topics,
+    ...states
+  }
+
+  const completedTopics = Object.values(updatedTopics).filter(Boolean).length
+  const totalTopics = Object.keys(updatedTopics).length
+  const percentage = totalTopics > 0 ? (completedTopics / totalTopics * 100) : 0
+
+  return {
+    ...prevData,
+    topics: updatedTopics,
+    overall_progress: {
+      percentage,
+      completed: completedTopics,
+      total: totalTopics
+    }
+  }
+}
+
 export function useProgress() {
   const [progressData, setProgressData] = useState({
     topics: {},
@@ -54,36 +77,24 @@ export function useProgress() {
     }
   }, [])
 
-  const updateTopicProgress = useCallback(async (requestData) => {
-    const { topic_id, is_completed } = requestData
+  // Show topic states right away, send them to the backend, and put the
+  // changed topics back to their previous state if the request fails
+  const submitTopicChanges = useCallback(async (endpoint, requestData, changes) => {
+    let previousStates = {}
 
     // Optimistic update: immediately update UI
     setProgressData(prevData => {
-      const updatedTopics = {
-        ...prevData.topics,
-        [topic_id]: is_completed
-      }
-
-      // Calculate optimistic overall progress
-      const completedTopics = Object.values(updatedTopics).filter(Boolean).length
-      const totalTopics = Object.keys(updatedTopics).length
-      const optimisticPercentage = totalTopics > 0 ? (completedTopics / totalTopics * 100) : 0
-
-      return {
-        ...prevData,
-        topics: updatedTopics,
-        overall_progress: {
-          percentage: optimisticPercentage,
-          completed: completedTopics,
-          total: totalTopics
-        }
-      }
+      previousStates = {}
+      Object.keys(changes).forEach(topicId => {
+        previousStates[topicId] = prevData.topics[topicId] || false
+      })
+      return withTopicStates(prevData, changes)
     })
 
     setLoading(true)
 
     try {
-      const response = await fetch(`${API_CONFIG.BASE_URL}/update-topic`, {
+      const response = await fetch(`${API_CONFIG.BASE_URL}/${endpoint}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -112,27 +123,7 @@ export function useProgress() {
       setError('Failed to update progress. Please try again.')
 
       // Revert optimistic update on error
-      setProgressData(prevData => {
-        const revertedTopics = {
-          ...prevData.topics,
-          [topic_id]: !is_completed // Revert to previous state
-        }
-
-        // Recalculate overall progress
-        const completedTopics = Object.values(revertedTopics).filter(Boolean).length
-        const totalTopics = Object.keys(revertedTopics).length
-        const revertedPercentage = totalTopics > 0 ? (completedTopics / totalTopics * 100) : 0
-
-        return {
-          ...prevData,
-          topics: revertedTopics,
-          overall_progress: {
-            percentage: revertedPercentage,
-            completed: completedTopics,
-            total: totalTopics
-          }
-        }
-      })
+      setProgressData(prevData => withTopicStates(prevData, previousStates))
 
       throw err
     } finally {
@@ -140,6 +131,23 @@ export function useProgress() {
     }
   }, [])
 
+  const updateTopicProgress = useCallback(async (requestData) => {
+    const { topic_id, is_completed } = requestData
+    return submitTopicChanges('update-topic', requestData, { [topic_id]: is_completed })
+  }, [submitTopicChanges])
+
+  // Apply several topic changes (e.g. a whole chapter) with one request
+  const updateTopicsProgress = useCallback(async (requestData) => {
+    const { updates } = requestData
+    if (!updates || updates.length === 0) return
+
+    const changes = {}
+    updates.forEach(({ topic_id, is_completed }) => {
+      changes[topic_id] = is_completed
+    })
+    return submitTopicChanges('update-topics', requestData, changes)
+  }, [submitTopicChanges])
+
   const updateProgressFromBackend = useCallback((progressData) => {
     if (!progressData) return
 
@@ -180,6 +188,7 @@ export function useProgress() {
     loading,
     error,
     updateTopicProgress,
+    updateTopicsProgress,
     loadProgress,
     updateProgressFromBackend,
     initializeDefaultProgress
@@ -34,6 +34,7 @@ function StudentTracker() {
     loading: progressLoading,
     error: progressError,
     updateTopicProgress,
+    updateTopicsProgress,
     loadProgress
   } = useProgress()
 
@@ -87,6 +88,26 @@ function StudentTracker() {
     }
   }, [user, selectedSyllabusId, updateTopicProgress])
 
+  // Handle a chapter checkbox: every topic of the chapter in one request
+  const handleChapterToggle = useCallback(async (topicIds, isCompleted) => {
+    if (!user || !selectedSyllabusId) {
+      showStatus('Please sign in and select a syllabus to submit progress.', 'error')
+      return
+    }
+
+    try {
+      await updateTopicsProgress({
+        student_email: user.email,
+        student_name: user.name,
+        syllabus_id: selectedSyllabusId,
+        updates: topicIds.map(topicId => ({ topic_id: topicId, is_completed: isCompleted }))
+      })
+      showStatus('Progress saved!', 'success')
+    } catch (error) {
+      console.error('Failed to update chapter progress:', error)
+    }
+  }, [user, selectedSyllabusId, updateTopicsProgress])
+
   // Show status message
   const showStatus = useCallback((message, type = 'info') => {
     setStatusMessage({ message, type })
@@ -157,6 +178,7 @@ function StudentTracker() {
               syllabusData={syllabusData}
               progressData={progressData}
               onTopicToggle={handleTopicToggle}
+              onChapterToggle={handleChapterToggle}
               disabled={progressLoading}
             />
           )}
@@ -1,34 +1,27 @@
-import React, { useState } from 'react'
-import {
-  Chart as ChartJS,
-  CategoryScale,
-  LinearScale,
-  BarElement,
-  Title,
-  Tooltip,
-  Legend,
-  ArcElement,
-} from 'chart.js'
-import { Bar, Doughnut } from 'react-chartjs-2'
+import React, { useEffect, useState } from 'react'
 import { useDashboardStore } from '../../stores/dashboardStore'
 import StatisticsOverview from './StatisticsOverview'
 import ProgressChart from './ProgressChart'
-
-// Register ChartJS components
-ChartJS.register(
-  CategoryScale,
-  LinearScale,
-  BarElement,
-  Title,
-  Tooltip,
-  Legend,
-  ArcElement
-)
+import ProgressBar from '../ui/ProgressBar'
 
 function AnalyticsView() {
-  const { allStudentsProgress, allSyllabuses, selectedViewSyllabusId, setSelectedViewSyllabusId } = useDashboardStore()
+  const {
+    allStudentsProgress,
+    allSyllabuses,
+    analytics,
+    loadAnalytics,
+    progressWatermark,
+    selectedViewSyllabusId,
+    setSelectedViewSyllabusId
+  } = useDashboardStore()
   const [analyticsSyllabus, setAnalyticsSyllabus] = useState(selectedViewSyllabusId || '')
 
+  // Statistics are computed by the server; reload them whenever the
+  // selection changes or a sync brought in new progress
+  useEffect(() => {
+    loadAnalytics(analyticsSyllabus)
+  }, [analyticsSyllabus, progressWatermark, loadAnalytics])
+
   // Filter students by selected syllabus for analytics
   const filteredStudents = React.useMemo(() => {
     if (!analyticsSyllabus || analyticsSyllabus === 'all') {
@@ -55,206 +48,12 @@ function AnalyticsView() {
     }
   }, [allStudentsProgress, allSyllabuses, analyticsSyllabus])
 
-  // Progress distribution chart data
-  const progressChartData = React.useMemo(() => {
-    const progressRanges = {
-      '0-25': 0,
-      '25-50': 0,
-      '50-75': 0,
-      '75-100': 0
-    }
-
-    filteredStudents.forEach(student => {
-      const progress = student.progress_percentage || 0
-      if (progress <= 25) progressRanges['0-25']++
-      else if (progress <= 50) progressRanges['25-50']++
-      else if (progress <= 75) progressRanges['50-75']++
-      else progressRanges['75-100']++
-    })
-
-    return {
-      labels: ['0-25%', '25-50%', '50-75%', '75-100%'],
-      datasets: [
-        {
-          label: 'Number of Students',
-          data: [
-            progressRanges['0-25'],
-            progressRanges['25-50'],
-            progressRanges['50-75'],
-            progressRanges['75-100']
-          ],
-          backgroundColor: [
-            'rgba(239, 68, 68, 0.8)',
-            'rgba(245, 158, 11, 0.8)',
-            'rgba(59, 130, 246, 0.8)',
-            'rgba(34, 197, 94, 0.8)'
-          ],
-          borderColor: [
-            'rgb(239, 68, 68)',
-            'rgb(245, 158, 11)',
-            'rgb(59, 130, 246)',
-            'rgb(34, 197, 94)'
-          ],
-          borderWidth: 1,
-        },
-      ],
-    }
-  }, [filteredStudents])
-
-  // Syllabus distribution chart data
-  const syllabusChartData = React.useMemo(() => {
-    const syllabusCounts = {}
-
-    allStudentsProgress.forEach(student => {
-      const syllabusName = student.syllabus_name
-      if (syllabusName && syllabusName !== 'contact') {
-        syllabusCounts[syllabusName] = (syllabusCounts[syllabusName] || 0) + 1
-      }
-    })
-
-    const labels = Object.keys(syllabusCounts)
-    const data = Object.values(syllabusCounts)
-
-    // Generate colors dynamically
-    const colors = [
-      'rgba(59, 130, 246, 0.8)',
-      'rgba(16, 185, 129, 0.8)',
-      'rgba(245, 158, 11, 0.8)',
-      'rgba(139, 92, 246, 0.8)',
-      'rgba(236, 72, 153, 0.8)',
-      'rgba(14, 165, 233, 0.8)',
-      'rgba(20, 184, 166, 0.8)',
-      'rgba(249, 115, 22, 0.8)',
-    ]
-
-    return {
-      labels,
-      datasets: [
-        {
-          data,
-          backgroundColor: colors.slice(0, labels.length),
-          borderColor: colors.slice(0, labels.length).map(color => color.replace('0.8', '1')),
-          borderWidth: 1,
-        },
-      ],
-    }
-  }, [allStudentsProgress])
-
-  const progressChartOptions = {
-    responsive: true,
-    maintainAspectRatio: false,
-    plugins: {
-      legend: {
-        display: false,
-      },
-      title: {
-        display: true,
-        text: 'Student Progress Distribution',
-        font: {
-          size: 18,
-          weight: 'bold'
-        },
-        color: '#374151'
-      },
-      tooltip: {
-        backgroundColor: 'rgba(255, 255, 255, 0.95)',
-        titleColor: '#1f2937',
-        bodyColor: '#4b5563',
-        borderColor: '#e5e7eb',
-        borderWidth: 1,
-        cornerRadius: 8,
-        padding: 12
-      }
-    },
-    scales: {
-      y: {
-        beginAtZero: true,
-        grid: {
-          color: 'rgba(229, 231, 235, 0.5)'
-        },
-        ticks: {
-          color: '#6b7280'
-        },
-        title: {
-          display: true,
-          text: 'Number of Students',
-          color: '#4b5563',
-          font: {
-            size: 14,
-            weight: '500'
-          }
-        }
-      },
-      x: {
-        grid: {
-          display: false
-        },
-        ticks: {
-          color: '#6b7280'
-        },
-        title: {
-          display: true,
-          text: 'Progress Range',
-          color: '#4b5563',
-          font: {
-            size: 14,
-            weight: '500'
-          }
-        }
-      }
-    },
-    animation: {
-      duration: 1000,
-      easing: 'easeOutQuart'
-    }
-  }
-
-  const syllabusChartOptions = {
-    responsive: true,
-    maintainAspectRatio: false,
-    plugins: {
-      legend: {
-        position: 'right',
-        labels: {
-          usePointStyle: true,
-          padding: 20,
-          font: {
-            size: 12
-          }
-        }
-      },
-      title: {
-        display: true,
-        text: 'Syllabus Distribution',
-        font: {
-          size: 18,
-          weight: 'bold'
-        },
-        color: '#374151'
-      },
-      tooltip: {
-        backgroundColor: 'rgba(255, 255, 255, 0.95)',
-        titleColor: '#1f2937',
-        bodyColor: '#4b5563',
-        borderColor: '#e5e7eb',
-        borderWidth: 1,
-        cornerRadius: 8,
-        padding: 12
-      }
-    },
-    animation: {
-      duration: 1000,
-      easing: 'easeOutQuart'
-    }
-  }
-
-  // Calculate overall statistics based on filtered students
-  const totalStudents = filteredStudents.length
-  const totalAssignments = filteredStudents.length
-  const totalSyllabuses = analyticsSyllabus ? 1 : allSyllabuses.filter(s => s.id !== 'contact').length
-  const averageProgress = filteredStudents.length > 0
-    ? filteredStudents.reduce((sum, s) => sum + (s.progress_percentage || 0), 0) / filteredStudents.length
-    : 0
+  // Overall statistics from /analytics (for the selected syllabus, if any)
+  const summary = analytics?.overall
+  const totalSyllabuses = analyticsSyllabus && analyticsSyllabus !== 'all'
+    ? 1
+    : Object.keys(analytics?.syllabuses || {}).filter(id => id !== 'contact').length
+  const topics = analytics?.topics || []
 
   // Handle syllabus selection change
   const handleSyllabusChange = (syllabusId) => {
@@ -306,19 +105,40 @@ function AnalyticsView() {
       <section>
         <h2 className="text-2xl font-bold text-gray-900 mb-6">Dashboard Overview</h2>
         <StatisticsOverview
-          totalStudents={totalStudents}
-          averageProgress={averageProgress}
+          totalStudents={summary?.students || 0}
+          averageProgress={summary?.average_progress || 0}
+          medianProgress={summary?.median_progress || 0}
+          activeStudents={summary?.active_students || 0}
+          activeDays={analytics?.active_days || 7}
           totalSyllabuses={totalSyllabuses}
-          totalAssignments={totalAssignments}
+          totalAssignments={summary?.assignments || 0}
         />
       </section>
 
       {/* Progress Analytics Section */}
       <section>
         <h2 className="text-2xl font-bold text-gray-900 mb-6">Progress Analytics</h2>
-        <ProgressChart filteredStudents={filteredStudents} />
+        <ProgressChart histogram={summary?.histogram} />
       </section>
 
+      {/* Topic Completion Section (one syllabus selected) */}
+      {topics.length > 0 && (
+        <section className="bg-white p-6 rounded-lg shadow-sm border border-gray-200">
+          <h3 className="text-xl font-semibold text-gray-800 mb-4">Topic Completion</h3>
+          <div className="space-y-3">
+            {topics.map(topic => (
+              <div key={topic.topic_id}>
+                <div className="flex justify-between text-sm text-gray-700 mb-1">
+                  <span>{topic.chapter} - {topic.subchapter}</span>
+                  <span className="text-gray-500">{topic.completed} students</span>
+                </div>
+                <ProgressBar progress={topic.completion_rate} />
+              </div>
+            ))}
+          </div>
+        </section>
+      )}
+
       {/* Additional Analytics */}
       <section className="bg-white p-6 rounded-lg shadow-sm border border-gray-200">
         <h3 className="text-xl font-semibold text-gray-800 mb-4">Performance Insights</h3>
@@ -5,11 +5,17 @@ const API_CONFIG = {
   BASE_URL: import.meta.env.DEV ? 'http://localhost:5000/tracker' : '/tracker'
 }
 
+// How often to poll a running backup job
+const JOB_POLL_INTERVAL = 1000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
 function BackupManagement() {
   const [backups, setBackups] = useState([])
   const [loading, setLoading] = useState(false)
   const [message, setMessage] = useState({ type: '', text: '' })
   const [backupName, setBackupName] = useState('')
+  const [backupJob, setBackupJob] = useState(null)
   const [confirmDelete, setConfirmDelete] = useState(null)
 
   // Fetch backups on component mount
@@ -52,8 +58,14 @@ function BackupManagement() {
       const data = await response.json()
 
       if (data.success) {
-        setMessage({ type: 'success', text: data.message })
+        setMessage({ type: 'info', text: data.message })
         setBackupName('')
+        const job = await waitForBackupJob(data.job_id)
+        if (job.status === 'done') {
+          setMessage({ type: 'success', text: `Backup '${job.filename}' created successfully` })
+        } else {
+          setMessage({ type: 'error', text: job.error || 'Backup failed' })
+        }
         fetchBackups() // Refresh the list
       } else {
         setMessage({ type: 'error', text: data.error || 'Failed to create backup' })
@@ -61,10 +73,27 @@ function BackupManagement() {
     } catch (error) {
       setMessage({ type: 'error', text: 'Network error while creating backup' })
     } finally {
+      setBackupJob(null)
       setLoading(false)
     }
   }
 
+  // Backups and restores run on the server in the background; poll until done
+  const waitForBackupJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`${API_CONFIG.BASE_URL}/backups/jobs/${jobId}`)
+      const data = await response.json()
+      if (!data.success) {
+        throw new Error(data.error || 'Failed to get backup status')
+      }
+      setBackupJob(data.job)
+      if (data.job.finished) {
+        return data.job
+      }
+      await sleep(JOB_POLL_INTERVAL)
+    }
+  }
+
   const restoreBackup = async (filename) => {
     if (!confirm(`Are you sure you want to restore from backup "${filename}"? This will replace the current database.`)) {
       return
@@ -81,15 +110,25 @@ function BackupManagement() {
       const data = await response.json()
 
       if (data.success) {
-        setMessage({ type: 'success', text: data.message + ' Page will refresh in 3 seconds...' })
-        // Refresh the page after successful restore
-        setTimeout(() => window.location.reload(), 3000)
+        setMessage({ type: 'info', text: data.message })
+        const job = await waitForBackupJob(data.job_id)
+        if (job.status === 'done') {
+          setMessage({
+            type: 'success',
+            text: `Database restored from backup '${filename}' successfully (current data saved as '${job.safety_backup}'). Page will refresh in 3 seconds...`
+          })
+          // Refresh the page after successful restore
+          setTimeout(() => window.location.reload(), 3000)
+        } else {
+          setMessage({ type: 'error', text: job.error || 'Failed to restore backup' })
+        }
       } else {
         setMessage({ type: 'error', text: data.error || 'Failed to restore backup' })
       }
     } catch (error) {
       setMessage({ type: 'error', text: 'Network error while restoring backup' })
     } finally {
+      setBackupJob(null)
       setLoading(false)
     }
   }
@@ -181,8 +220,21 @@ function BackupManagement() {
             {loading ? 'Creating...' : 'Create Backup'}
           </button>
         </div>
+        {backupJob && (
+          <div className="mt-3">
+            <div className="w-full bg-gray-200 rounded-full h-2">
+              <div
+                className="bg-blue-600 h-2 rounded-full transition-all"
+                style={{ width: `${Math.round(backupJob.progress * 100)}%` }}
+              ></div>
+            </div>
+            <p className="text-sm text-gray-500 mt-1">
+              {backupJob.status === 'storing' ? 'Storing changed data...' : `Copying: ${Math.round(backupJob.progress * 100)}%`}
+            </p>
+          </div>
+        )}
         <p className="text-sm text-gray-500 mt-2">
-          A timestamp will be automatically added to the backup filename.
+          A timestamp will be automatically added to the backup filename. Backups are taken in the background without pausing student updates.
         </p>
       </section>
 
@@ -216,9 +268,8 @@ function BackupManagement() {
                   <div className="flex-1">
                     <h4 className="font-medium text-gray-900 mb-1">{backup.name}</h4>
                     <div className="text-sm text-gray-500 space-y-1">
-                      <p>Size: {formatFileSize(backup.size)}</p>
-                      <p>Created: {formatDate(backup.created)}</p>
-                      <p>Modified: {formatDate(backup.modified)}</p>
+                      <p>Size: {formatFileSize(backup.size)} ({formatFileSize(backup.stored_size)} new data stored)</p>
+                      <p>Created: {formatDate(backup.created)}{backup.kind === 'auto' ? ' (scheduled)' : ''}</p>
                     </div>
                   </div>
                   <div className="flex gap-2">
@@ -252,8 +303,9 @@ function BackupManagement() {
         <ul className="text-yellow-700 space-y-1 text-sm">
           <li>• Creating a backup will save the current state of your database</li>
           <li>• Restoring a backup will replace the current database with the selected backup</li>
-          <li>• A backup of the current database is automatically created before any restore operation</li>
-          <li>• Backups are stored locally and persist across server restarts</li>
+          <li>• A backup of the current database (pre-restore_...) is automatically created before any restore operation</li>
+          <li>• Restored backups are checked for corruption first; the switch-over itself takes only milliseconds</li>
+          <li>• Backups are stored locally and persist across server restarts; data unchanged since an earlier backup is stored only once</li>
           <li>• It's recommended to create regular backups before making significant changes</li>
         </ul>
       </section>
@@ -21,23 +21,16 @@ ChartJS.register(
   Legend
 )
 
-function ProgressChart({ filteredStudents = [] }) {
+function ProgressChart({ histogram = {} }) {
   const chartData = React.useMemo(() => {
+    // Buckets computed by /analytics, keyed "0-25", "25-50", ...
     const progressRanges = {
-      '0-25': 0,
-      '25-50': 0,
-      '50-75': 0,
-      '75-100': 0
+      '0-25': histogram['0-25'] || 0,
+      '25-50': histogram['25-50'] || 0,
+      '50-75': histogram['50-75'] || 0,
+      '75-100': histogram['75-100'] || 0
     }
 
-    filteredStudents.forEach(student => {
-      const progress = student.progress_percentage || 0
-      if (progress <= 25) progressRanges['0-25']++
-      else if (progress <= 50) progressRanges['25-50']++
-      else if (progress <= 75) progressRanges['50-75']++
-      else progressRanges['75-100']++
-    })
-
     return {
       labels: ['0-25%', '25-50%', '50-75%', '75-100%'],
       datasets: [
@@ -65,7 +58,7 @@ function ProgressChart({ filteredStudents = [] }) {
         },
       ],
     }
-  }, [filteredStudents])
+  }, [histogram])
 
   const options = {
     responsive: true,
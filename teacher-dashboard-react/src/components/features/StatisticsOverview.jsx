@@ -1,7 +1,7 @@
 import React from 'react'
 import StatCard from '../ui/StatCard'
 
-function StatisticsOverview({ totalStudents, averageProgress, totalSyllabuses, totalAssignments }) {
+function StatisticsOverview({ totalStudents, averageProgress, medianProgress, activeStudents, activeDays, totalSyllabuses, totalAssignments }) {
   return (
     <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
       <StatCard
@@ -12,10 +12,22 @@ function StatisticsOverview({ totalStudents, averageProgress, totalSyllabuses, t
         title="Average Progress (Selected Syllabus)"
         value={`${Math.round(averageProgress)}%`}
       />
+      <StatCard
+        title="Median Progress"
+        value={`${Math.round(medianProgress)}%`}
+      />
+      <StatCard
+        title={`Active Students (${activeDays} days)`}
+        value={activeStudents}
+      />
       <StatCard
         title="Syllabuses Assigned"
         value={totalSyllabuses}
       />
+      <StatCard
+        title="Assignments"
+        value={totalAssignments}
+      />
     </div>
   )
 }
@@ -15,6 +15,29 @@ const STORAGE_KEYS = {
 // Auto-refresh interval in milliseconds (5 minutes)
 const AUTO_REFRESH_INTERVAL = 5 * 60 * 1000
 
+// Delay before syncing after a pushed event, so bursts cost one request
+const EVENT_SYNC_DELAY = 1000
+
+// Event types sent by the /events stream
+const PROGRESS_EVENT_TYPES = ['progress', 'assigned', 'removed', 'resync']
+
+// Rows requested per page from paginated endpoints
+const PAGE_SIZE = 500
+
+// Key of one row of /all-progress
+const progressRowKey = (row) => `${row.email}\n${row.syllabus_id}`
+
+// Same order as the server listing: name, syllabus name, email, syllabus ID
+const compareProgressRows = (a, b) => {
+  for (const field of ['name', 'syllabus_name', 'email', 'syllabus_id']) {
+    const left = a[field] || ''
+    const right = b[field] || ''
+    if (left < right) return -1
+    if (left > right) return 1
+  }
+  return 0
+}
+
 // Load initial state from localStorage
 const loadInitialState = () => ({
   selectedViewSyllabusId: localStorage.getItem(STORAGE_KEYS.SELECTED_SYLLABUS_ID) || 'all',
@@ -25,8 +48,10 @@ const loadInitialState = () => ({
 export const useDashboardStore = create((set, get) => ({
   // Data
   allStudentsProgress: [],
+  progressWatermark: null,
   allSyllabuses: [],
   displayedStudents: [],
+  analytics: null,
 
   // UI State
   ...loadInitialState(),
@@ -35,6 +60,9 @@ export const useDashboardStore = create((set, get) => ({
   isRefreshing: false,
   lastRefreshTime: null,
   autoRefreshEnabled: true,
+  eventSource: null,
+  eventsConnected: false,
+  eventSyncTimeout: null,
 
   // Statistics
   statistics: {
@@ -67,13 +95,15 @@ export const useDashboardStore = create((set, get) => ({
     if (autoRefreshInterval) {
       clearInterval(autoRefreshInterval)
     }
+    // Polling is only a fallback for when the event stream is down
     const interval = setInterval(() => {
-      const { autoRefreshEnabled, isRefreshing } = get()
-      if (autoRefreshEnabled && !isRefreshing) {
+      const { autoRefreshEnabled, isRefreshing, eventsConnected } = get()
+      if (autoRefreshEnabled && !isRefreshing && !eventsConnected) {
         get().refreshData()
       }
     }, AUTO_REFRESH_INTERVAL)
     set({ autoRefreshInterval: interval })
+    get().connectEvents()
   },
 
   stopAutoRefresh: () => {
@@ -82,6 +112,52 @@ export const useDashboardStore = create((set, get) => ({
       clearInterval(autoRefreshInterval)
       set({ autoRefreshInterval: null })
     }
+    get().disconnectEvents()
+  },
+
+  connectEvents: () => {
+    if (get().eventSource || typeof EventSource === 'undefined') return
+
+    const source = new EventSource(`${API_CONFIG.BASE_URL}/events`)
+    source.onopen = () => {
+      // Catch up on anything committed while we were disconnected
+      set({ eventsConnected: true })
+      get().scheduleEventSync()
+    }
+    source.onerror = () => {
+      // EventSource reconnects by itself; poll until it does
+      set({ eventsConnected: false })
+    }
+    for (const type of PROGRESS_EVENT_TYPES) {
+      source.addEventListener(type, () => get().scheduleEventSync())
+    }
+    set({ eventSource: source })
+  },
+
+  disconnectEvents: () => {
+    const { eventSource, eventSyncTimeout } = get()
+    if (eventSource) {
+      eventSource.close()
+    }
+    if (eventSyncTimeout) {
+      clearTimeout(eventSyncTimeout)
+    }
+    set({ eventSource: null, eventsConnected: false, eventSyncTimeout: null })
+  },
+
+  scheduleEventSync: () => {
+    if (get().eventSyncTimeout) return
+
+    const timeout = setTimeout(() => {
+      set({ eventSyncTimeout: null })
+      if (get().isRefreshing) {
+        // The running sync may have missed this change; try again afterwards
+        get().scheduleEventSync()
+        return
+      }
+      get().refreshData()
+    }, EVENT_SYNC_DELAY)
+    set({ eventSyncTimeout: timeout })
   },
 
   refreshData: async () => {
@@ -90,7 +166,8 @@ export const useDashboardStore = create((set, get) => ({
 
     set({ isRefreshing: true })
     try {
-      await get().loadDashboardData()
+      // Only fetch the rows changed since the last load
+      await get().syncProgress()
       const now = new Date().toISOString()
       set({ lastRefreshTime: now })
       localStorage.setItem(STORAGE_KEYS.LAST_DATA_REFRESH, now)
@@ -193,7 +270,96 @@ export const useDashboardStore = create((set, get) => ({
 
   loadAllProgress: async () => {
     try {
-      const response = await fetch(`${API_CONFIG.BASE_URL}/all-progress`, {
+      // Follow next_cursor until the last page; the first page's watermark
+      // covers every change made while the later pages are fetched
+      const allRows = []
+      let cursor = null
+      let watermark = null
+      do {
+        const params = new URLSearchParams({ limit: PAGE_SIZE })
+        if (cursor) params.set('cursor', cursor)
+
+        const response = await fetch(`${API_CONFIG.BASE_URL}/all-progress?${params}`, {
+          method: 'GET',
+          headers: { 'Accept': 'application/json' }
+        })
+
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`)
+        }
+
+        const result = await response.json()
+
+        if (result && result.status === 'success' && Array.isArray(result.data)) {
+          allRows.push(...result.data)
+          cursor = result.next_cursor
+          watermark = watermark || result.watermark
+        } else {
+          throw new Error('Invalid data format received from server for student progress')
+        }
+      } while (cursor)
+
+      set({ allStudentsProgress: allRows, progressWatermark: watermark })
+      get().filterStudents()
+    } catch (error) {
+      console.error('Error loading dashboard data:', error)
+      throw error
+    }
+  },
+
+  syncProgress: async () => {
+    const { progressWatermark } = get()
+    if (!progressWatermark) {
+      await get().loadAllProgress()
+      return
+    }
+
+    const params = new URLSearchParams({ since: progressWatermark })
+    const response = await fetch(`${API_CONFIG.BASE_URL}/all-progress?${params}`, {
+      method: 'GET',
+      headers: { 'Accept': 'application/json' }
+    })
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`)
+    }
+
+    const result = await response.json()
+
+    if (!result || result.status !== 'success' || !Array.isArray(result.data)) {
+      throw new Error('Invalid data format received from server for student progress')
+    }
+
+    if (result.full) {
+      // The server no longer recognises our watermark and sent everything
+      set({ allStudentsProgress: result.data, progressWatermark: result.watermark })
+      get().filterStudents()
+      return
+    }
+
+    if (result.data.length > 0) {
+      const rows = new Map(get().allStudentsProgress.map(row => [progressRowKey(row), row]))
+      for (const change of result.data) {
+        if (change.deleted) {
+          rows.delete(progressRowKey(change))
+        } else {
+          rows.set(progressRowKey(change), change)
+        }
+      }
+      set({ allStudentsProgress: Array.from(rows.values()).sort(compareProgressRows) })
+      get().filterStudents()
+    }
+    set({ progressWatermark: result.watermark })
+  },
+
+  // Class statistics computed by the server (/analytics); the browser
+  // revalidates the ETag, so unchanged data costs a 304
+  loadAnalytics: async (syllabusId) => {
+    try {
+      const params = new URLSearchParams()
+      if (syllabusId && syllabusId !== 'all') params.set('syllabus_id', syllabusId)
+
+      const response = await fetch(`${API_CONFIG.BASE_URL}/analytics?${params}`, {
         method: 'GET',
         headers: { 'Accept': 'application/json' }
       })
@@ -204,15 +370,13 @@ export const useDashboardStore = create((set, get) => ({
 
       const result = await response.json()
 
-      if (result && result.status === 'success' && Array.isArray(result.data)) {
-        set({ allStudentsProgress: result.data })
-        get().filterStudents()
+      if (result.status === 'success' && result.data) {
+        set({ analytics: result.data })
       } else {
-        throw new Error('Invalid data format received from server for student progress')
+        throw new Error('Invalid data format for analytics')
       }
     } catch (error) {
-      console.error('Error loading dashboard data:', error)
-      throw error
+      console.error('Error loading analytics:', error)
     }
   },
 
@@ -1,7 +1,9 @@
 import collections
 import enum
+import hashlib
 import json
 import os
+import threading
 from collections import defaultdict
 from os.path import sep
 
@@ -337,72 +339,175 @@ def load_subjects_files():
     return sub_dict
 
 
+# Compiled cache of generate_syllabus_database_data() output, so the course
+# files are only parsed again when they change. Bump the version whenever the
+# structure of the generated data changes.
+compiled_cache_path = os.path.join(syllabus_path, ".compiled_syllabuses.json")
+COMPILED_CACHE_VERSION = 2
+
+_compiled_cache = None
+_compiled_cache_lock = threading.Lock()
+
+
+def _file_signature(file_path):
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _course_source_signature(course_id):
+    sub_path = os.path.join(syllabus_path, course_id)
+    return [_file_signature(sub_path + ".md"), _file_signature(sub_path + ".json")]
+
+
+def _empty_compiled_cache():
+    return {
+        "version": COMPILED_CACHE_VERSION,
+        # A change to the parser invalidates every compiled course
+        "converter": _file_signature(os.path.abspath(__file__)),
+        "courses": {},
+    }
+
+
+def _get_compiled_cache():
+    """Load the compiled cache from disk on first use"""
+    global _compiled_cache
+    if _compiled_cache is None:
+        _compiled_cache = _empty_compiled_cache()
+        try:
+            with open(compiled_cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = None
+        if (
+            isinstance(cache, dict)
+            and cache.get("version") == _compiled_cache["version"]
+            and cache.get("converter") == _compiled_cache["converter"]
+        ):
+            _compiled_cache = cache
+    return _compiled_cache
+
+
+def _write_compiled_cache(cache):
+    """Atomically write the compiled cache; a read-only tree just skips it"""
+    tmp_path = compiled_cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(tmp_path, compiled_cache_path)
+    except OSError:
+        pass
+
+
 def generate_syllabus_database_data():
     """
     Generate syllabus data in format suitable for database insertion
     Returns: dict with syllabus structure where each variant is treated as independent syllabus
+
+    Parsed courses are served from the compiled cache; only courses whose
+    source files changed since the cache was written are parsed again
     """
-    sub_dict = load_subjects_files()
-    syllabus_data = {}
+    with _compiled_cache_lock:
+        cache = _get_compiled_cache()
+        courses = cache["courses"]
+        changed = False
+
+        for course_id in all_courses:
+            signature = _course_source_signature(course_id)
+            entry = courses.get(course_id)
+            if entry is None or entry["signature"] != signature:
+                entry = {
+                    "signature": signature,
+                    "syllabuses": generate_course_database_data(Course(course_id)),
+                }
+                courses[course_id] = entry
+                changed = True
+
+        for course_id in list(courses):
+            if course_id not in all_courses:
+                courses.pop(course_id)
+                changed = True
+
+        if changed:
+            _write_compiled_cache(cache)
+
+        syllabus_data = {}
+        for course_id in all_courses:
+            syllabus_data.update(courses[course_id]["syllabuses"])
 
-    for course_id, course in sub_dict.items():
-        for variant_name, variant in course.variants.items():
-            # Treat each variant as an independent syllabus
-            variant_id = f"{course_id}_{variant_name.lower()}"
-            syllabus_data[variant_id] = {
-                "id": variant_id,
-                "name": f"{course.name} - {variant_name}",
-                "description": variant.description,
-                "variants": {
-                    f"{variant_id}_main": {
-                        "id": f"{variant_id}_main",
-                        "name": "Main",
-                        "description": variant.description,
-                        "topics": [],
-                    }
-                },
-            }
+    return syllabus_data
 
-            # Extract topics from chapters
-            topic_counter = 1
-            for chapter in variant.chapters:
-                chapter_name = chapter.name
-
-                if hasattr(chapter, "topics") and chapter.topics:
-                    # Course has topics within chapters
-                    for topic_name, topic in chapter.topics.items():
-                        topic_id = (
-                            f"{variant_id}_{chapter.number}_{topic.number}"
-                        )
-                        syllabus_data[variant_id]["variants"][
-                            f"{variant_id}_main"
-                        ]["topics"].append(
-                            {
-                                "id": topic_id,
-                                "chapter_name": chapter_name,
-                                "topic_name": topic_name,
-                                "topic_number": topic.number,
-                                "description": topic.description,
-                                "weight": 1,  # Default weight, can be adjusted
-                            }
-                        )
-                        topic_counter += 1
-                else:
-                    # Course has chapters as topics (like 0606)
-                    topic_id = f"{variant_id}_{chapter.number}_1"
+
+def generate_course_database_data(course: "Course"):
+    """
+    Generate the database data for one parsed course
+    Returns: dict of syllabus_id -> syllabus structure, one per course variant
+    """
+    syllabus_data = {}
+    course_id = course.id
+
+    for variant_name, variant in course.variants.items():
+        # Treat each variant as an independent syllabus
+        variant_id = f"{course_id}_{variant_name.lower()}"
+        syllabus_data[variant_id] = {
+            "id": variant_id,
+            "name": f"{course.name} - {variant_name}",
+            "description": variant.description,
+            "variants": {
+                f"{variant_id}_main": {
+                    "id": f"{variant_id}_main",
+                    "name": "Main",
+                    "description": variant.description,
+                    "topics": [],
+                }
+            },
+        }
+
+        # Extract topics from chapters
+        topic_counter = 1
+        for chapter in variant.chapters:
+            chapter_name = chapter.name
+
+            if hasattr(chapter, "topics") and chapter.topics:
+                # Course has topics within chapters
+                for topic_name, topic in chapter.topics.items():
+                    topic_id = (
+                        f"{variant_id}_{chapter.number}_{topic.number}"
+                    )
                     syllabus_data[variant_id]["variants"][
                         f"{variant_id}_main"
                     ]["topics"].append(
                         {
                             "id": topic_id,
                             "chapter_name": chapter_name,
-                            "topic_name": chapter_name,  # Use chapter name as topic name
-                            "topic_number": 1,
-                            "description": chapter.description or "",
-                            "weight": 1,
+                            "chapter_number": chapter.number,
+                            "topic_name": topic_name,
+                            "topic_number": topic.number,
+                            "description": topic.description,
+                            "weight": 1,  # Default weight, can be adjusted
                         }
                     )
                     topic_counter += 1
+            else:
+                # Course has chapters as topics (like 0606)
+                topic_id = f"{variant_id}_{chapter.number}_1"
+                syllabus_data[variant_id]["variants"][
+                    f"{variant_id}_main"
+                ]["topics"].append(
+                    {
+                        "id": topic_id,
+                        "chapter_name": chapter_name,
+                        "chapter_number": chapter.number,
+                        "topic_name": chapter_name,  # Use chapter name as topic name
+                        "topic_number": 1,
+                        "description": chapter.description or "",
+                        "weight": 1,
+                    }
+                )
+                topic_counter += 1
 
     return syllabus_data
 
@@ -424,6 +529,7 @@ def create_contact_syllabus():
                     {
                         "id": "contact_main_1_1",
                         "chapter_name": "Administration",
+                        "chapter_number": 1,
                         "topic_name": "Contact Administrator",
                         "topic_number": 1,
                         "description": "Please contact the administrator to get enrolled in your desired courses.",
@@ -432,6 +538,7 @@ def create_contact_syllabus():
                     {
                         "id": "contact_main_1_2",
                         "chapter_name": "Enrollment",
+                        "chapter_number": 1,
                         "topic_name": "Enroll in Course",
                         "topic_number": 2,
                         "description": "Once you contact the administrator, you will be enrolled in the appropriate courses.",
@@ -452,6 +559,34 @@ def get_all_syllabus_data():
     return all_data
 
 
+def get_syllabus_source_files():
+    """
+    List the files the syllabus data is generated from: the .md/.json of every
+    course plus this module (which defines the parsing and the contact syllabus)
+    """
+    files = []
+    for course_id in all_courses:
+        sub_path = os.path.join(syllabus_path, course_id)
+        files.append(sub_path + ".md")
+        files.append(sub_path + ".json")
+    files.append(os.path.abspath(__file__))
+    return files
+
+
+def get_syllabus_sources_hash():
+    """
+    Hash the syllabus source files, so callers can tell whether the generated
+    syllabus data can have changed without parsing anything
+    """
+    digest = hashlib.sha256()
+    for file_path in get_syllabus_source_files():
+        digest.update(os.path.basename(file_path).encode("utf-8"))
+        if os.path.exists(file_path):
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
 if __name__ == "__main__":
     # Test the syllabus parsing
     data = get_all_syllabus_data()
@@ -0,0 +1,292 @@
+"""Write benchmark and lost-update stress check for DatabaseManager.
+
+Usage, from the repository root:
+    python -m tests.stress_progress bench-writes [threads] [writes per thread]
+    python -m tests.stress_progress stress [threads] [toggles per thread]
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+
+from coalescer import ToggleCoalescer
+from database import DatabaseManager
+
+
+def benchmark_writes(threads=8, writes=200, write_batch_size=64, write_batch_window=0.0):
+    """Toggle topics from many threads at once against a scratch database.
+
+    Returns (writes per second, median latency ms, 99th percentile latency ms).
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = DatabaseManager(
+            os.path.join(tmp_dir, "bench.db"),
+            write_batch_size=write_batch_size,
+            write_batch_window=write_batch_window,
+        )
+        syllabus_id = manager.get_all_syllabuses()[0]["id"]
+        topic_ids = [topic["id"] for topic in manager.get_syllabus_topics(syllabus_id)]
+        for n in range(threads):
+            manager.register_student(f"bench{n}@example.com", f"Bench {n}")
+
+        latencies = []
+
+        def toggle(n):
+            email = f"bench{n}@example.com"
+            for i in range(writes):
+                started = time.perf_counter()
+                manager.update_topic_progress(
+                    email, syllabus_id, topic_ids[i % len(topic_ids)], i % 2 == 0
+                )
+                latencies.append(time.perf_counter() - started)
+
+        workers = [threading.Thread(target=toggle, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        manager.close_connections()
+
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def stress_progress_updates(threads=16, toggles=200, busy_timeout_ms=10, clicks=8):
+    """Toggle topics of one student from many threads at once and check that
+    no update was lost.
+
+    Threads alternate between two managers on the same scratch file, as two
+    worker processes would: one group-commits, the other writes on each
+    calling thread, so transactions really contend for the SQLite write lock.
+    busy_timeout is cut to busy_timeout_ms so BEGIN IMMEDIATE has to retry.
+    Every thread owns its own topics of the shared progress row and knows
+    their final state.
+
+    Then, as the app does, clicks go through a ToggleCoalescer with the
+    no-op check (see _stress_replayed_clicks). Returns a dict with the
+    counts and a list of problems (empty when the stored state matches).
+    """
+    class StressDatabaseManager(DatabaseManager):
+        CONNECTION_PRAGMAS = tuple(
+            (name, busy_timeout_ms if name == "busy_timeout" else value)
+            for name, value in DatabaseManager.CONNECTION_PRAGMAS
+        )
+
+    email = "stress@example.com"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "stress.db")
+        managers = [
+            StressDatabaseManager(db_file, write_batch_size=64),
+            StressDatabaseManager(db_file, write_batch_size=1),
+        ]
+        syllabus_id = managers[0].get_all_syllabuses()[0]["id"]
+        topic_ids = [topic["id"] for topic in managers[0].get_syllabus_topics(syllabus_id)]
+        managers[0].register_student(email, "Stress Test")
+        managers[0].assign_student_to_syllabus(email, syllabus_id)
+
+        expected = {}
+        logged = [0] * threads
+        problems = []
+
+        def toggle(n):
+            manager = managers[n % 2]
+            rng = random.Random(n)
+            own_topics = topic_ids[n::threads]
+            states = {topic_id: False for topic_id in own_topics}
+            try:
+                for _ in range(toggles):
+                    # Mostly single clicks, sometimes a bulk update of a few topics
+                    chosen = rng.sample(own_topics, min(len(own_topics), rng.choice((1, 1, 1, 3))))
+                    updates = [(topic_id, rng.random() < 0.5) for topic_id in chosen]
+                    manager.update_topics_progress(email, syllabus_id, updates)
+                    if any(states[topic_id] != is_completed for topic_id, is_completed in updates):
+                        logged[n] += len(updates)
+                    states.update(updates)
+            except Exception as e:
+                problems.append(f"thread {n}: {e!r}")
+            expected.update(states)
+
+        workers = [threading.Thread(target=toggle, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        update_rows = _check_stored_topics(managers[0], email, syllabus_id, expected, problems)
+        if update_rows != sum(logged):
+            problems.append(f"{update_rows} topic_updates rows, expected {sum(logged)}")
+
+        clients = min(threads, len(topic_ids))
+        short_circuited = _stress_replayed_clicks(
+            managers[0], syllabus_id, topic_ids[:clients], clicks, problems
+        )
+
+        busy_retries = sum(manager.get_busy_retries() for manager in managers)
+        for manager in managers:
+            manager.close_connections()
+
+    return {
+        "toggles": threads * toggles,
+        "seconds": elapsed,
+        "busy_retries": busy_retries,
+        "clicks": clients * (clicks + 1) + clients // 2,
+        "short_circuited": short_circuited,
+        "problems": problems,
+    }
+
+
+def _stress_replayed_clicks(manager, syllabus_id, topic_ids, clicks, problems):
+    """Send clicks through a ToggleCoalescer and check each topic ends in its last click's state.
+
+    One client per topic fires alternating clicks 35 ms apart without
+    waiting for the answers. Writes are held back 50 ms, so a click arrives
+    while the previous one is still on its way to the database and the one
+    before that is stored: it matches the stored state, yet must not be
+    answered from it. Once all are answered, every client replays its
+    final state, as after a reconnect, which must be answered without a
+    write. Appends to problems; returns the number of clicks answered
+    without a write.
+    """
+    email = "stress-clicks@example.com"
+    name = "Stress Clicks"
+    # A stored progress row lets unchanged clicks be answered from a read
+    manager.update_topics_progress(
+        email, syllabus_id, [(topic_id, False) for topic_id in topic_ids], name
+    )
+
+    def slow_submit(student_email, syllabus_id, updates, student_name):
+        time.sleep(0.05)
+        return manager.submit_write(
+            manager.update_topics_progress, student_email, syllabus_id, updates, student_name
+        )
+
+    coalescer = ToggleCoalescer(
+        slow_submit, window=0.005, read_unchanged=manager.get_unchanged_progress
+    )
+    expected = {}
+
+    def send(topic_id, is_completed):
+        try:
+            coalescer.update(email, syllabus_id, [(topic_id, is_completed)], name)
+        except Exception as e:
+            problems.append(f"click on {topic_id}: {e!r}")
+
+    def client(n, topic_id):
+        # Half of the topics end completed, half not
+        states = [i % 2 == 0 for i in range(clicks + n % 2)]
+        expected[topic_id] = states[-1]
+        senders = []
+        for is_completed in states:
+            sender = threading.Thread(target=send, args=(topic_id, is_completed))
+            sender.start()
+            senders.append(sender)
+            time.sleep(0.035)
+        for sender in senders:
+            sender.join()
+
+    workers = [
+        threading.Thread(target=client, args=(n, topic_id))
+        for n, topic_id in enumerate(topic_ids)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    _check_stored_topics(manager, email, syllabus_id, expected, problems)
+
+    unchanged = coalescer.get_stats()["unchanged"]
+    for topic_id, is_completed in expected.items():
+        send(topic_id, is_completed)
+    replayed = coalescer.get_stats()["unchanged"] - unchanged
+    if replayed != len(expected):
+        problems.append(f"{len(expected) - replayed} replayed clicks were written again")
+    return unchanged + replayed
+
+
+def _check_stored_topics(manager, email, syllabus_id, expected, problems):
+    """Compare a student's stored topics and counters with the expected
+    {topic_id: is_completed}; appends to problems and returns the number
+    of topic_updates rows
+    """
+    weights = manager._get_cached_syllabus(syllabus_id)["weights"]
+    with manager.transaction() as cursor:
+        cursor.execute(
+            """
+            SELECT topic_id FROM student_topic_completion
+            WHERE student_email = ? AND syllabus_id = ?
+            """,
+            (email, syllabus_id)
+        )
+        stored = {row[0] for row in cursor.fetchall()}
+        cursor.execute(
+            """
+            SELECT completed_count, completed_weight FROM student_progress
+            WHERE student_email = ? AND syllabus_id = ?
+            """,
+            (email, syllabus_id)
+        )
+        completed_count, completed_weight = cursor.fetchone()
+        cursor.execute(
+            "SELECT COUNT(*) FROM topic_updates WHERE student_email = ? AND syllabus_id = ?",
+            (email, syllabus_id)
+        )
+        update_rows = cursor.fetchone()[0]
+
+    completed = {topic_id for topic_id, is_completed in expected.items() if is_completed}
+    if stored != completed:
+        problems.append(
+            f"{email}: {len(completed - stored)} completed topics missing, "
+            f"{len(stored - completed)} unexpectedly completed"
+        )
+    if completed_count != len(completed):
+        problems.append(f"{email}: completed_count is {completed_count}, expected {len(completed)}")
+    if completed_weight != sum(weights[topic_id] for topic_id in completed):
+        problems.append(f"{email}: completed_weight does not match the completed topics")
+    return update_rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["bench-writes"] and len(sys.argv) <= 4:
+        # Compare committing every write on its own with group commit
+        threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        writes = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        for batch_size in (1, 8, 64):
+            rate, median_ms, p99_ms = benchmark_writes(threads, writes, batch_size)
+            print(
+                f"batch size {batch_size:>3}: {rate:8.0f} writes/s, "
+                f"median {median_ms:6.2f} ms, p99 {p99_ms:7.2f} ms ({threads} threads)"
+            )
+        sys.exit(0)
+
+    if sys.argv[1:2] == ["stress"] and len(sys.argv) <= 4:
+        # Fails (exit code 1) if concurrent toggles lost an update
+        threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+        toggles = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        result = stress_progress_updates(threads, toggles)
+        print(
+            f"{result['toggles']} toggles from {threads} threads in {result['seconds']:.1f} s, "
+            f"{result['busy_retries']} busy retries"
+        )
+        print(
+            f"{result['clicks']} coalesced clicks, "
+            f"{result['short_circuited']} answered without a write"
+        )
+        for problem in result["problems"]:
+            print("   ", problem)
+        print("No lost updates" if not result["problems"] else "Lost or failed updates")
+        sys.exit(1 if result["problems"] else 0)
+
+    print("Usage: python -m tests.stress_progress bench-writes [threads] [writes per thread]")
+    print("       python -m tests.stress_progress stress [threads] [toggles per thread]")
@@ -0,0 +1,110 @@
+"""Query plan check: every DatabaseManager query must use an index.
+
+Run with pytest, or "python -m tests.test_query_plans" from the repository
+root to print the offending plans.
+"""
+import os
+import sqlite3
+import tempfile
+
+from database import FULL_SCAN_MARKER, DatabaseManager
+
+
+class _QueryRecordingDatabaseManager(DatabaseManager):
+    """DatabaseManager that records every SQL statement its connections run"""
+
+    def __init__(self, db_path):
+        self.statements = []
+        super().__init__(db_path)
+
+    def _open_connection(self):
+        conn = super()._open_connection()
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+
+def check_query_plans():
+    """Run every DatabaseManager query against a scratch database and return
+    the (sql, plan) pairs whose EXPLAIN QUERY PLAN contains a full table scan
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = _QueryRecordingDatabaseManager(os.path.join(tmp_dir, "plans.db"))
+        syllabus_id = manager.get_all_syllabuses()[0]["id"]
+        topic_ids = [topic["id"] for topic in manager.get_syllabus_topics(syllabus_id)]
+
+        # Exercise every public method, with the syllabus cache cold
+        manager.invalidate_syllabus_cache()
+        manager.register_student("plan@example.com", "Plan Check")
+        manager.assign_student_to_syllabus("plan@example.com", syllabus_id)
+        manager.update_topic_progress("plan@example.com", syllabus_id, topic_ids[0], True)
+        manager.update_topics_progress(
+            "plan@example.com", syllabus_id, [(topic_id, True) for topic_id in topic_ids[:3]]
+        )
+        manager.update_topic_progress("plan@example.com", syllabus_id, topic_ids[0], False)
+        manager.update_topic_progress("plan@example.com", syllabus_id, topic_ids[0], False)
+        manager.get_unchanged_progress(
+            "plan@example.com", syllabus_id, [(topic_ids[1], True)], "Plan Check"
+        )
+        manager.get_student_progress("plan@example.com", syllabus_id)
+        manager.get_student_syllabuses("plan@example.com")
+        manager.get_all_students_progress()
+        manager.get_all_students_progress(since=manager.get_progress_watermark())
+        manager.get_progress_analytics()
+        manager.get_progress_analytics(syllabus_id)
+        manager.get_all_students_progress(
+            limit=10, after=["Plan Check", "", "plan@example.com", ""]
+        )
+        manager.get_student_list()
+        manager.get_student_list(limit=10, after=["Plan Check", ""])
+        manager.get_syllabus_structure(syllabus_id)
+        manager.recompute_progress(syllabus_id)
+        manager.recompute_progress()
+        manager.compact_topic_updates(
+            os.path.join(tmp_dir, "archive"), horizon_days=-1, batch_size=2, pause=0
+        )
+        manager.remove_student_from_syllabus("plan@example.com", syllabus_id)
+        manager.init_db(force_seed=True)
+
+        problems = []
+        conn = sqlite3.connect(manager.db_path)
+        seen = set()
+        for sql in manager.statements:
+            statement = sql.strip()
+            if statement in seen or FULL_SCAN_MARKER in statement:
+                continue
+            seen.add(statement)
+            if statement.split(None, 1)[0].upper() not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+                continue
+
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]
+            # "SCAN t" without an index is a full table scan; "SCAN t USING
+            # INDEX" walks an index in order, SEARCH steps are lookups, and
+            # "SCAN (subquery-N)" reads rows a subquery already produced
+            if any(
+                step.startswith("SCAN ") and " INDEX " not in step
+                and not step.startswith("SCAN (subquery")
+                for step in plan
+            ):
+                problems.append((statement, plan))
+        conn.close()
+        manager.close_connections()
+
+    return problems
+
+
+def test_no_full_table_scans():
+    assert check_query_plans() == []
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Fails (exit code 1) if any query does a full table scan
+    problems = check_query_plans()
+    for sql, plan in problems:
+        print("Full table scan in query:")
+        print("   ", " ".join(sql.split()))
+        for step in plan:
+            print("      ", step)
+    print(f"{len(problems)} queries with full table scans")
+    sys.exit(1 if problems else 0)
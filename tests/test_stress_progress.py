@@ -0,0 +1,6 @@
+from tests.stress_progress import stress_progress_updates
+
+
+def test_no_lost_updates():
+    result = stress_progress_updates(threads=8, toggles=50)
+    assert result["problems"] == []
@@ -0,0 +1,108 @@
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+# Fields of an archived topic_updates row, in column order
+ARCHIVE_FIELDS = ("id", "student_email", "syllabus_id", "topic_id", "is_completed", "timestamp")
+
+# Archive files are named after the topic_updates ID range they hold
+ARCHIVE_FILENAME = "topic_updates_{first:012d}-{last:012d}.jsonl.gz"
+ARCHIVE_FILENAME_PATTERN = re.compile(r"^topic_updates_(\d+)-(\d+)\.jsonl\.gz$")
+
+
+def write_archive(archive_dir, rows):
+    """Write topic_updates rows (tuples in ARCHIVE_FIELDS order, ascending id)
+    to a gzip JSON-lines file; returns its path.
+
+    The name only depends on the ID range, and the file is renamed into
+    place once complete, so writing the same batch again after a crash
+    just replaces it.
+    """
+    os.makedirs(archive_dir, mode=0o755, exist_ok=True)
+    path = os.path.join(
+        archive_dir, ARCHIVE_FILENAME.format(first=rows[0][0], last=rows[-1][0])
+    )
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            for row in rows:
+                record = dict(zip(ARCHIVE_FIELDS, row))
+                record["is_completed"] = bool(record["is_completed"])
+                f.write(json.dumps(record).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_archives(archive_dir):
+    """Return (first_id, last_id, path) for every archive file, oldest first"""
+    if not os.path.isdir(archive_dir):
+        return []
+
+    archives = []
+    for filename in os.listdir(archive_dir):
+        match = ARCHIVE_FILENAME_PATTERN.match(filename)
+        if match:
+            archives.append(
+                (int(match.group(1)), int(match.group(2)), os.path.join(archive_dir, filename))
+            )
+    return sorted(archives)
+
+
+def iter_archived_updates(archive_dir, student_email=None, syllabus_id=None,
+                          min_id=None, max_id=None):
+    """Yield archived topic updates (dicts with ARCHIVE_FIELDS), oldest first.
+
+    Filters are optional; files outside [min_id, max_id] are not opened.
+    """
+    for first_id, last_id, path in list_archives(archive_dir):
+        if (min_id is not None and last_id < min_id) or (max_id is not None and first_id > max_id):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if student_email is not None and record["student_email"] != student_email:
+                    continue
+                if syllabus_id is not None and record["syllabus_id"] != syllabus_id:
+                    continue
+                if min_id is not None and record["id"] < min_id:
+                    continue
+                if max_id is not None and record["id"] > max_id:
+                    continue
+                yield record
+
+
+def start_compaction_schedule(manager, archive_dir, horizon_days, interval_seconds):
+    """Run manager.compact_topic_updates() every interval_seconds on a daemon thread"""
+    if interval_seconds <= 0:
+        return None
+
+    def schedule():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                manager.compact_topic_updates(archive_dir, horizon_days)
+            except Exception as e:
+                # Leave the rows in place and try again next interval
+                print(f"Topic update compaction failed: {e}")
+
+    thread = threading.Thread(target=schedule, name="topic-compaction", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python topic_archive.py <archive dir> [student email] [syllabus id]
+    # Prints the archived updates as JSON lines, for audits
+    if not 2 <= len(sys.argv) <= 4:
+        print("Usage: python topic_archive.py <archive dir> [student email] [syllabus id]")
+        sys.exit(2)
+    for record in iter_archived_updates(*sys.argv[1:2], *sys.argv[2:4]):
+        print(json.dumps(record))